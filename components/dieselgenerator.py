@@ -12,8 +12,17 @@ Minimum runtime 15min: https://powercontinuity.co.uk/knowledge-base/ups-and-gene
 Power curve values: https://www.generatorsource.com/Diesel_Fuel_Consumption.aspx
 """
 
+# Fuel consumption data of the process {database path: pd.DataFrame}
+power_curve_data_cache = {}
+
 
 class DieselGenerator:
+    """
+    Class to represent Diesel Generators
+    """
+
+    columns = ['P [W]', 'P [%]', 'Fuel consumption [l/h]', 'Fuel cost [US$]']
+
     def __init__(self,
                  env=None,
                  name: str = None,
@@ -35,12 +44,13 @@ class DieselGenerator:
             self.model = 'conventional'
         self.power_curve_data = self.get_power_curve_data()
         self.power_curve = self.select_power_curve()
-
-        self.df = pd.DataFrame(columns=['P [W]',
-                                        'P [%]',
-                                        'Fuel consumption [l/h]',
-                                        f'Fuel cost [US$]'],
-                               index=self.env.time)
+        # Results are preallocated arrays, self.df is built on access
+        self.index = pd.Index(self.env.time)
+        self.power = np.full(len(self.index), np.nan, dtype=self.env.dtype)
+        self.p_relative = np.full(len(self.index), np.nan, dtype=self.env.dtype)
+        self.fuel_consumption = np.full(len(self.index), np.nan, dtype=self.env.dtype)
+        self.fuel_cost = np.full(len(self.index), np.nan, dtype=self.env.dtype)
+        self._df = None
         # Economic parameters
         self.c_invest_n = c_invest_n  # USD/kW
         if c_invest is None:
@@ -67,43 +77,76 @@ class DieselGenerator:
                                f'Specific operation maintenance cost [US$/kW]': int(self.c_op_main_n),
                                f'Operation maintenance cost [US$/a]': int(self.c_op_main_n * self.p_n / 1000)}
 
+    @property
+    def df(self):
+        """
+        Generator results
+        :return: pd.DataFrame
+            power, relative power, fuel consumption and fuel cost
+        """
+        if self._df is None:
+            values = [self.power, self.p_relative, self.fuel_consumption, self.fuel_cost]
+            self._df = pd.DataFrame(dict(zip(self.columns, values)),
+                                    index=self.index)
+
+        return self._df
+
     def run(self,
             clock: dt.datetime,
             power: float):
         """
-        Run generator model
+        Run generator model for one time step
         :param clock: dt.datetime
             time stamp
         :param power: float
             power [W]
-        :return: clock, power
+        :return: float
+            generator power [W]
+        """
+        i = self.env.time_axis.position(clock)
+        power = float(self.run_array(power=np.array([power]),
+                                     start=i)[0])
+
+        return power
+
+    def run_array(self, power: np.ndarray, start: int = 0):
         """
+        Run generator model over a power demand series
+        Power is limited to p_n, conventional generators run at least at 30 % of p_n
+        :param power: np.ndarray
+            power demand [W]
+        :param start: int
+            position of the first time step in the environment time axis
+        :return: np.ndarray
+            generator power [W]
+        """
+        power = np.minimum(np.asarray(power, dtype=float), self.p_n)
         if self.model == 'conventional':
-            if 0 < power <= self.p_n * 0.3:
-                power = self.p_n * 0.3
-            else:
-                power = power
-        p_relative = power/self.p_n
+            power = np.where((power > 0) & (power < self.p_min), self.p_min, power)
         fuel_consumption = self.calc_fuel_consumption(power=power)
-        fuel_cost = self.calc_fuel_cost(fuel_consumption=fuel_consumption)
-        # Set values
-        self.df.at[clock, 'P [W]'] = power
-        self.df.at[clock, 'P [%]'] = p_relative
-        self.df.at[clock, 'Fuel consumption [l/h]'] = fuel_consumption
-        self.df.at[clock, 'Fuel cost [US$]'] = fuel_cost
+        steps = slice(start, start + len(power))
+        self.power[steps] = power
+        self.p_relative[steps] = power / self.p_n
+        self.fuel_consumption[steps] = fuel_consumption
+        self.fuel_cost[steps] = self.calc_fuel_cost(fuel_consumption=fuel_consumption)
+        self._df = None
 
         return power
+
     @staticmethod
     def get_power_curve_data():
         """
-        Get power curves from database
+        Get power curves from database, the table is read once per process
         :return: pd.DataFrame
             df with power curves
         """
-        conn = sqlite3.connect(f"{sys.path[1]}/data/miguel.db")
-        df = pd.read_sql('SELECT * FROM dg_fuel_consumption_data', conn)
+        path = f"{sys.path[1]}/data/miguel.db"
+        if path not in power_curve_data_cache:
+            conn = sqlite3.connect(path)
+            power_curve_data_cache[path] = pd.read_sql('SELECT * FROM dg_fuel_consumption_data', conn)
+            conn.close()
 
-        return df
+        return power_curve_data_cache[path]
 
     def select_power_curve(self):
         """
@@ -123,13 +166,13 @@ class DieselGenerator:
     def calc_fuel_consumption(self,
                               power: float):
         """
-        Calculate fuel consumption in l/h based on power demand
-        :param power: float
+        Calculate fuel consumption in l/h based on power demand, generators at standstill consume no fuel
+        :param power: float or np.ndarray
             power
-        :return: float
+        :return: float or np.ndarray
             fuel_consumption [l/h]
         """
-        fuel_consumption = self.power_curve(power / self.p_n)
+        fuel_consumption = np.where(power > 0, self.power_curve(power / self.p_n), 0)
 
         return fuel_consumption
 
@@ -1,10 +1,14 @@
-import pandas as pd
+# MiGUEL modules
+from timeseries import create_frame
 
 
 class Grid:
     """
     Class to represent grid
     """
+
+    columns = ['P [W]', 'Blackout']
+
     def __init__(self,
                  env,
                  name: str = None,
@@ -18,6 +22,7 @@ class Grid:
         """
         self.env = env
         self.name = name
-        self.df = pd.DataFrame(columns=['P [W]', 'Blackout'],
-                               index=self.env.time)
+        self.df = create_frame(index=self.env.time,
+                               columns=self.columns,
+                               dtype=self.env.dtype)
         self.c_var_n = c_var_n
@@ -2,12 +2,67 @@ import sys
 import pandas as pd
 import datetime as dt
 import numpy as np
+# MiGUEL modules
+from timeseries import create_frame, write_column
+
+# BDEW reference load profiles {profile: np.ndarray [season, daytype, quarter hour]}
+bdew_profile_cache = {}
+# BDEW reference load profiles in environment resolution {(profile, step): np.ndarray [season, daytype, step]}
+bdew_resolution_cache = {}
+# Unscaled annual BDEW load profiles {(profile, step, start, end, hemisphere): np.ndarray}
+bdew_annual_cache = {}
+bdew_seasons = ['winter', 'summer', 'transition']
+# Daytypes: workday (w), saturday (5), sunday (6)
+bdew_daytypes = ['w', '5', '6']
+# Supported time steps [min]
+time_steps = [1, 5, 10, 15, 30, 60]
+
+
+def convert_resolution(values: np.ndarray, step: float, new_step: float):
+    """
+    Convert values to new time resolution along the last axis
+    Downsampling averages the values (constant over their time step) over each new time step,
+    upsampling interpolates linearly on the time axis and holds the last value
+    :param values: np.ndarray
+        values with time on the last axis
+    :param step: float
+        time step of values [min]
+    :param new_step: float
+        new time step [min]
+    :return: np.ndarray
+        values in new time resolution
+    """
+    n = values.shape[-1]
+    if new_step == step:
+        return values
+    elif new_step > step:
+        factor = new_step / step
+        if factor % 1 == 0 and n % factor == 0:
+            return values.reshape(*values.shape[:-1], n // int(factor), int(factor)).mean(axis=-1)
+        # New time steps covering fractions of time steps (e.g. 10 to 15 min): difference of the cumulative energy
+        # interpolated at the edges of the new time steps
+        cumulative = np.concatenate([np.zeros((*values.shape[:-1], 1)), np.cumsum(values, axis=-1)], axis=-1)
+        edges = np.arange(int(n / factor) + 1) * factor
+        lower = np.floor(edges).astype(int)
+        upper = np.minimum(lower + 1, n)
+        weight = edges - lower
+        energy = cumulative[..., lower] * (1 - weight) + cumulative[..., upper] * weight
+        return np.diff(energy, axis=-1) / factor
+    else:
+        position = np.arange(int(n * step / new_step)) * new_step / step
+        lower = np.floor(position).astype(int)
+        upper = np.minimum(lower + 1, n - 1)
+        weight = position - lower
+        return values[..., lower] * (1 - weight) + values[..., upper] * weight
 
 
 class Load:
     """
     Class to represent loads
     """
+
+    columns = ['P [W]']
+
     def __init__(self,
                  env,
                  name: str = None,
@@ -20,7 +75,9 @@ class Load:
             self.annual_consumption = annual_consumption * 1000  # Wh
         if ref_profile is not None:
             self.ref_profile = ref_profile
-        self.df = pd.DataFrame(columns=['P [W]'], index=self.env.time)
+        self.df = create_frame(index=self.env.time,
+                               columns=self.columns,
+                               dtype=self.env.dtype)
         self.sum = self.df['P [W]'].sum()
         if load_profile is not None:
             # Read load_profile
@@ -42,15 +99,8 @@ class Load:
         if resolution:
             self.adjust_length(profile=self.load_profile)
         else:
-            # Create Scaled load profile
-            start = dt.datetime(year=self.env.t_start.year, month=1, day=1, hour=0, minute=0)
-            end = dt.datetime(year=self.env.t_start.year, month=1, day=1, hour=23, minute=45)
-            res_index = pd.date_range(start=start, end=end, freq=self.env.t_step)
-            self.scaled_load_profile = pd.DataFrame(columns=['P [W]'], index=res_index)
-            self.scaled_load_profile.index = pd.to_datetime(self.scaled_load_profile.index)
-            # Summarize and fill values based on time step
-            values = self.summarize_values()
-            self.fill_values(values=values)
+            # Create scaled load profile in environment time resolution
+            self.scaled_load_profile = self.convert_profile(profile=self.load_profile)
             # Adjust scaled profile length to env.time_series
             self.adjust_length(profile=self.scaled_load_profile)
 
@@ -65,30 +115,23 @@ class Load:
         else:
             return False
 
-    def summarize_values(self):
+    def convert_profile(self, profile: pd.DataFrame):
         """
-        Summarize values based on self.env.t_step
-        :return: list
-            mean values
+        Convert load profile to environment time resolution
+        :param profile: pd.DataFrame
+            load profile
+        :return: pd.DataFrame
+            load profile in environment time resolution
         """
-        lp_time_step = (self.load_profile.index[1] - self.load_profile.index[0]) / dt.timedelta(minutes=1)
-        if lp_time_step == 1:
-            factor = 1
-        else:
-            factor = 15
-        lp_index = self.load_profile.index
-        values = self.load_profile.groupby(np.arange(len(lp_index)) // int(self.env.i_step / factor))['P [W]'].mean().tolist()
+        lp_time_step = (profile.index[1] - profile.index[0]) / dt.timedelta(minutes=1)
+        values = convert_resolution(values=profile['P [W]'].to_numpy(dtype=float),
+                                    step=lp_time_step,
+                                    new_step=self.env.i_step)
+        index = pd.date_range(start=profile.index[0],
+                              periods=len(values),
+                              freq=self.env.t_step)
 
-        return values
-
-    def fill_values(self, values: list):
-        """
-        Fill values in scaled_load_profile
-        :param values: list
-            list with values
-        :return: None
-        """
-        self.scaled_load_profile['P [W]'] = values
+        return pd.DataFrame({'P [W]': values}, index=index)
 
     def adjust_length(self, profile: pd.DataFrame):
         """
@@ -103,7 +146,7 @@ class Load:
         # Repeat load profile according to factor
         repeated_profile = np.tile(profile['P [W]'].values, factor)
         # Assign values to df
-        self.df['P [W]'] = repeated_profile[:len(self.df)]
+        write_column(df=self.df, col='P [W]', values=repeated_profile[:len(self.df)], dtype=self.env.dtype)
 
     def standard_load_profile(self):
         """
@@ -140,25 +183,21 @@ class Load:
         df['Weekday'] = np.where(df['Weekday'] < 5, 0, df['Weekday'])
         # Define season
         month = df.index.month
-        season_conditions = [month.isin(self.env.seasons[season]) for season in self.env.seasons]
-        season_values = list(self.env.seasons.keys())
-        df['Season'] = np.select(season_conditions, season_values)
-        # Retrieve BDEW profile
-        bdew_profile = self.retrieve_bdew_profile(profile=profile)
-        # FIll df with matching reference profile based on season and weekday
-        if self.env.i_step == 15:
-            day_values = df.loc[::96, 'Weekday'].values
-            season_values = df.loc[::96, 'Season'].values
-            profiles = [bdew_profile.get(season).get(day) for day, season in zip(day_values, season_values)]
-            df['P [W]'] = np.concatenate([profile.values for profile in profiles])
-        elif self.env.i_step == 60:
-            day_values = df.loc[::24, 'Weekday'].values
-            season_values = df.loc[::24, 'Season'].values
-            profiles = [bdew_profile.get(season).get(day) for day, season in zip(day_values, season_values)]
-            adjusted_profiles = [profile.rolling(4).mean().iloc[3::4].reset_index(drop=True) for profile in profiles]
-            df['P [W]'] = np.concatenate([adjusted_profile.values for adjusted_profile in adjusted_profiles])
-        else:
-            return
+        season_conditions = [month.isin(self.env.seasons[season]) for season in bdew_seasons]
+        season_index = np.select(season_conditions, range(len(bdew_seasons)))
+        df['Season'] = np.array(bdew_seasons)[season_index]
+        if self.env.i_step not in time_steps:
+            sys.exit(f'BDEW reference load profiles support time steps of {time_steps} min.')
+        key = (profile, self.env.i_step, self.env.time_series[0], self.env.time_series[-1], self.env.hemisphere)
+        if key not in bdew_annual_cache:
+            # Retrieve BDEW profile in environment time resolution
+            bdew_profile = self.retrieve_bdew_profile(profile=profile,
+                                                      step=self.env.i_step)
+            # Fill matching reference profile based on season and weekday
+            daytype_index = np.select([df['Weekday'] == 0, df['Weekday'] == 5, df['Weekday'] == 6], [0, 1, 2])
+            step_index = np.arange(len(df)) % bdew_profile.shape[-1]
+            bdew_annual_cache[key] = bdew_profile[season_index, daytype_index, step_index]
+        df['P [W]'] = bdew_annual_cache[key]
         # Scale annual consumption and fill values
         total = df['P [W]'].sum() * self.env.i_step / 60  # Annual consumption in kWH - scaled to time resolution
         # print(total)
@@ -168,37 +207,28 @@ class Load:
 
         return df
 
-    def retrieve_bdew_profile(self, profile: str = None):
+    def retrieve_bdew_profile(self, profile: str = None, step: float = 15):
         """
         Retrieve BDEW reference load profile from miguel.db
+        All season and daytype columns are read in one query, profiles are cached for the process lifetime
         :param profile: str
-        :return: list
-            bdew standard load profiles
+        :param step: float
+            time step [min]
+        :return: np.ndarray
+            bdew standard load profiles [season, daytype, time step of day]
         """
         if profile is not None:
-            winter_5 = pd.read_sql_query(f'SELECT {profile}_winter_5 from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            winter_6 = pd.read_sql_query(f'SELECT {profile}_winter_6 from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            winter_w = pd.read_sql_query(f'SELECT {profile}_winter_w from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            summer_5 = pd.read_sql_query(f'SELECT {profile}_summer_5 from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            summer_6 = pd.read_sql_query(f'SELECT {profile}_summer_6 from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            summer_w = pd.read_sql_query(f'SELECT {profile}_summer_w from bdew_standard_load_profile',
-                                         con=self.env.database.connect)
-            transition_5 = pd.read_sql_query(f'SELECT {profile}_transition_5 from bdew_standard_load_profile',
-                                             con=self.env.database.connect)
-            transition_6 = pd.read_sql_query(f'SELECT {profile}_transition_6 from bdew_standard_load_profile',
-                                             con=self.env.database.connect)
-            transition_w = pd.read_sql_query(f'SELECT {profile}_transition_w from bdew_standard_load_profile',
-                                             con=self.env.database.connect)
-
-            bdew_profile = {'winter': {5: winter_5, 6: winter_6, 0: winter_w},
-                            'summer': {5: summer_5, 6: summer_6, 0: summer_w},
-                            'transition': {5: transition_5, 6: transition_6, 0: transition_w}}
-
-            return bdew_profile
+            if profile not in bdew_profile_cache:
+                columns = [f'{profile}_{season}_{daytype}' for season in bdew_seasons for daytype in bdew_daytypes]
+                df = pd.read_sql_query(f'SELECT {", ".join(columns)} from bdew_standard_load_profile',
+                                       con=self.env.database.connect)
+                bdew_profile_cache[profile] = df.to_numpy(dtype=float).T.reshape(len(bdew_seasons),
+                                                                                  len(bdew_daytypes), -1)
+            if (profile, step) not in bdew_resolution_cache:
+                bdew_resolution_cache[(profile, step)] = convert_resolution(values=bdew_profile_cache[profile],
+                                                                            step=15,
+                                                                            new_step=step)
+
+            return bdew_resolution_cache[(profile, step)]
         else:
             return
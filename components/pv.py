@@ -1,11 +1,19 @@
-import random
 import sys
 import os
+import hashlib
 import pandas as pd
 import numpy as np
 import datetime as dt
 import pvlib
 from configparser import ConfigParser
+# MiGUEL modules
+from data.catalog import get_catalog
+from timeseries import create_frame, write_column
+
+# AC output of simulated PV systems {cache key: pd.Series}, shared by all PV instances of the process
+modelchain_cache = {}
+# AC output per W nominal power of picked PV systems {orientation key: dict}
+normalized_cache = {}
 
 
 class PV:
@@ -13,6 +21,8 @@ class PV:
     Class to represent PV Systems
     """
 
+    columns = ['P [W]']
+
     def __init__(self,
                  env,
                  name: str = None,
@@ -24,7 +34,9 @@ class PV:
                  c_var_n: float = 0,
                  co2_init: float = 460,
                  c_invest: float = None,
-                 c_op_main: float = None):
+                 c_op_main: float = None,
+                 normalized: bool = False,
+                 run_model: bool = True):
         """
         :param env: env.Environment
             System Environment
@@ -49,58 +61,78 @@ class PV:
             variable cost [US$/kWh]
         :param co2_init: float
             initial CO2-emissions during production [US$/kW]
+        :param normalized: bool
+            scale output of a cached PV system with the same orientation to p_n instead of picking a new system
+        :param run_model: bool
+            run pvlib simulation, False if the output is set by env.Environment.add_pv_batch
         """
         self.env = env
+        self.temperature_model = 'open_rack_glass_glass'
         self.name = name
-        self.df = pd.DataFrame(columns=['P [W]'],
-                               index=self.env.time)
-        # Location
+        self.df = create_frame(index=self.env.time,
+                               columns=self.columns,
+                               dtype=self.env.dtype)
+        # Location, the altitude is read by simulated PV systems only (load_model_data)
         self.longitude = self.env.longitude
         self.latitude = self.env.latitude
-        self.altitude = self.env.altitude
-        # Weather data
-        self.weather_data = self.env.weather_data[0]
-        self.weather_data['precipitable_water'] = 0.1
-        # Libraries
-        self.module_lib = self.retrieve_pvlib_library(component='module')
-        self.inverter_lib = self.retrieve_pvlib_library(component='inverter')
+        self.altitude = None
 
         if pv_profile is not None:
             # Create DataFrame from existing pv profile
-            self.df['P [W]'] = pv_profile
+            write_column(df=self.df, col='P [W]', values=pv_profile, dtype=self.env.dtype)
             self.p_n = p_n
         elif p_n is not None:
+            self.load_model_data()
             self.p_n = p_n
             self.longitude = self.env.longitude
             self.latitude = self.env.latitude
-            self.altitude = self.env.altitude
             if pv_data.get('surface_tilt') is None:
                 self.surface_tilt = 20
             else:
                 self.surface_tilt = pv_data.get('surface_tilt')
             self.surface_azimuth = pv_data.get('surface_azimuth')
-            system_parameters = self.pick_pv_system(min_module_power=pv_data.get('min_module_power'),
-                                                    max_module_power=pv_data.get('max_module_power'),
-                                                    inverter_power_range=pv_data.get('inverter_power_range'))
-            self.pv_module_parameters = system_parameters[0]
-            self.pv_module = system_parameters[1]
-            self.inverter_parameters = system_parameters[2]
-            self.inverter = system_parameters[3]
-            self.modules_per_string = system_parameters[4]
-            self.strings_per_inverter = system_parameters[5]
-            # Create Location, PVSystem and ModelChain
-            pvlib_parameters = self.create_pvlib_parameters()
-            self.location = pvlib_parameters[0]
-            self.pv_system = pvlib_parameters[1]
-            self.modelchain = pvlib_parameters[2]
-            # Run pvlib
-            self.annual_pv_yield = self.run(weather_data=self.weather_data)
-            self.annual_pv_yield.index = self.convert_index_time()
-            self.pv_yield = self.annual_pv_yield.loc[self.env.time_series[0]:self.env.time_series[-1]]
-            if self.env.i_step != 60:
-                self.pv_yield = self.interpolate_values()
-            self.df['P [W]'] = np.where(self.pv_yield < 0, 0, self.pv_yield)
+            reference = None
+            if normalized and run_model:
+                reference = normalized_cache.get(self.normalized_key(pv_data=pv_data))
+            if reference is not None:
+                # Scale output of reference system with the same orientation and selection parameters,
+                # only the module type is kept, the scaled system has no inverter and string configuration
+                self.pv_module = reference['pv_module']
+                self.pv_module_parameters = self.module_lib[self.pv_module]
+                self.inverter = None
+                self.inverter_parameters = None
+                self.modules_per_string = None
+                self.strings_per_inverter = None
+                self.location = None
+                self.pv_system = None
+                self.modelchain = None
+                self.annual_pv_yield = reference['P [W/W]'] * self.p_n
+            else:
+                system_parameters = self.pick_pv_system(min_module_power=pv_data.get('min_module_power'),
+                                                        max_module_power=pv_data.get('max_module_power'),
+                                                        inverter_power_range=pv_data.get('inverter_power_range'))
+                self.pv_module_parameters = system_parameters[0]
+                self.pv_module = system_parameters[1]
+                self.inverter_parameters = system_parameters[2]
+                self.inverter = system_parameters[3]
+                self.modules_per_string = system_parameters[4]
+                self.strings_per_inverter = system_parameters[5]
+                # Create Location, PVSystem and ModelChain
+                pvlib_parameters = self.create_pvlib_parameters()
+                self.location = pvlib_parameters[0]
+                self.pv_system = pvlib_parameters[1]
+                self.modelchain = pvlib_parameters[2]
+                # Run pvlib
+                if run_model:
+                    self.annual_pv_yield = self.run(weather_data=self.weather_data)
+                    if normalized:
+                        normalized_cache[self.normalized_key(pv_data=pv_data)] = {
+                            'pv_module': self.pv_module,
+                            'P [W/W]': self.annual_pv_yield / self.p_n}
+            if run_model:
+                self.set_yield(annual_pv_yield=self.annual_pv_yield)
         elif pv_data is not None:
+            self.load_model_data()
             if pv_data.get('surface_tilt') is None:
                 self.surface_tilt = 20
             else:
@@ -121,11 +153,8 @@ class PV:
             self.pv_system = pvlib_parameters[1]
             self.modelchain = pvlib_parameters[2]
             # Create Profile and dispatch pvlib
-            self.annual_pv_yield = self.run(weather_data=self.weather_data)
-            self.annual_pv_yield.index = self.convert_index_time()
-            self.pv_yield = self.annual_pv_yield.loc[self.env.time_series[0]:self.env.time_series[-1]]
-            self.pv_yield = self.interpolate_values()
-            self.df['P [W]'] = np.where(self.pv_yield < 0, 0, self.pv_yield)
+            if run_model:
+                self.set_yield(annual_pv_yield=self.run(weather_data=self.weather_data))
 
         # Economic parameters
         self.c_invest_n = c_invest_n
@@ -157,6 +186,20 @@ class PV:
             self.config = ConfigParser()
             self.create_config()
 
+    def load_model_data(self):
+        """
+        Load altitude, weather data and pvlib libraries of simulated PV systems,
+        PV systems with given profile skip them
+        :return: None
+        """
+        self.altitude = self.env.altitude
+        # Weather data
+        self.weather_data = self.env.weather_data[0]
+        self.weather_data['precipitable_water'] = 0.1
+        # Libraries
+        self.module_lib = self.retrieve_pvlib_library(component='module')
+        self.inverter_lib = self.retrieve_pvlib_library(component='inverter')
+
     def create_pvlib_parameters(self):
         """
         Create pvlib parameters
@@ -164,7 +207,7 @@ class PV:
             location, pv_system, modelchain
         """
         location = self.create_location()
-        pv_system = self.create_pv(temperature_model='open_rack_glass_glass',
+        pv_system = self.create_pv(temperature_model=self.temperature_model,
                                    strings_per_inverter=self.strings_per_inverter,
                                    modules_per_string=self.modules_per_string)
         modelchain = self.create_modelchain(pv_system=pv_system, location=location)
@@ -228,31 +271,130 @@ class PV:
                           location,
                           dc_model='cec'):
         """
+        Model steps are set explicitly, run_shared uses the same steps and shares modelchain_cache with run
         :param pv_system: pv.PVSystem
         :param dc_model:
-            default: Sandia PV Array Performance Model (no_loss)
+            default: CEC single diode model
         :return: pvlib.modelchain.ModelChain
             ModelChain object
         """
         modelchain = pvlib.modelchain.ModelChain(system=pv_system,
                                                  location=location,
                                                  name=self.name + ' ModelChain',
+                                                 transposition_model='haydavies',
                                                  dc_model=dc_model,
-                                                 aoi_model='no_loss')
+                                                 ac_model='sandia',
+                                                 aoi_model='no_loss',
+                                                 spectral_model='no_loss',
+                                                 temperature_model='sapm')
         return modelchain
 
     def run(self, weather_data):
         """
-        Run pvlib simulation
+        Run pvlib simulation, results of PV systems with the same configuration are taken from modelchain_cache
         :param weather_data: pd.DataFrame
         :return: pd.Series
             AC power output
         """
-        self.modelchain.run_model(weather=weather_data)
-        simulation_results = self.modelchain.results.ac
+        key = self.cache_key(weather_data=weather_data)
+        if key not in modelchain_cache:
+            self.modelchain.run_model(weather=weather_data)
+            modelchain_cache[key] = self.modelchain.results.ac
+        simulation_results = modelchain_cache[key].copy()
 
         return simulation_results
 
+    def run_shared(self, solar_data: pd.DataFrame):
+        """
+        Run pvlib simulation with solar position, airmass and extraterrestrial radiation of the environment
+        Model steps are the ones set in create_modelchain (haydavies transposition, no aoi and spectral losses,
+        SAPM cell temperature, CEC single diode model, Sandia inverter)
+        :param solar_data: pd.DataFrame
+            env.Environment.solar_data
+        :return: pd.Series
+            AC power output
+        """
+        key = self.cache_key(weather_data=self.weather_data)
+        if key not in modelchain_cache:
+            weather_data = self.weather_data
+            total_irradiance = self.pv_system.get_irradiance(solar_zenith=solar_data['apparent_zenith'],
+                                                             solar_azimuth=solar_data['azimuth'],
+                                                             dni=weather_data['dni'],
+                                                             ghi=weather_data['ghi'],
+                                                             dhi=weather_data['dhi'],
+                                                             dni_extra=solar_data['dni_extra'],
+                                                             airmass=solar_data['airmass_relative'],
+                                                             model='haydavies')
+            poa_global = total_irradiance['poa_global']
+            temp_cell = self.pv_system.get_cell_temperature(poa_global=poa_global,
+                                                            temp_air=weather_data['temp_air'],
+                                                            wind_speed=weather_data['wind_speed'],
+                                                            model='sapm')
+            diode_parameters = self.pv_system.calcparams_cec(effective_irradiance=poa_global,
+                                                             temp_cell=temp_cell)
+            dc = pvlib.pvsystem.singlediode(*diode_parameters)
+            # Single diode results without solution (low irradiance) are set to 0 as in ModelChain
+            dc = self.pv_system.scale_voltage_current_power(data=dc).fillna(0)
+            modelchain_cache[key] = self.pv_system.get_ac(model='sandia',
+                                                          p_dc=dc['p_mp'],
+                                                          v_dc=dc['v_mp'])
+        simulation_results = modelchain_cache[key].copy()
+
+        return simulation_results
+
+    def set_yield(self, annual_pv_yield: pd.Series):
+        """
+        Convert simulated annual AC output to environment time series and write it to self.df
+        :param annual_pv_yield: pd.Series
+            hourly AC power output
+        :return: None
+        """
+        self.annual_pv_yield = annual_pv_yield
+        self.annual_pv_yield.index = self.convert_index_time()
+        self.pv_yield = self.annual_pv_yield.loc[self.env.time_series[0]:self.env.time_series[-1]]
+        if self.env.i_step != 60:
+            self.pv_yield = self.interpolate_values()
+        write_column(df=self.df, col='P [W]', values=np.where(self.pv_yield < 0, 0, self.pv_yield),
+                     dtype=self.env.dtype)
+
+    def cache_key(self, weather_data: pd.DataFrame):
+        """
+        Create key of simulated PV output
+        :param weather_data: pd.DataFrame
+        :return: tuple
+            weather hash, location and PV configuration
+        """
+        return (self.weather_hash(weather_data=weather_data),
+                self.latitude, self.longitude, self.altitude, self.env.timezone,
+                self.pv_module, self.inverter, self.modules_per_string, self.strings_per_inverter,
+                self.surface_tilt, self.surface_azimuth, self.temperature_model)
+
+    @staticmethod
+    def weather_hash(weather_data: pd.DataFrame):
+        """
+        Hash weather data including index and column names
+        :param weather_data: pd.DataFrame
+        :return: str
+            hash
+        """
+        values = pd.util.hash_pandas_object(weather_data, index=True).values
+        columns = ','.join(str(col) for col in weather_data.columns)
+
+        return hashlib.sha256(values.tobytes() + columns.encode()).hexdigest()
+
+    def normalized_key(self, pv_data: dict):
+        """
+        Create key of normalized PV output
+        :param pv_data: dict
+            min_module_power, max_module_power and inverter_power_range of the system selection
+        :return: tuple
+            weather hash, location, orientation and selection parameters
+        """
+        return (self.weather_hash(weather_data=self.weather_data),
+                self.latitude, self.longitude, self.altitude, self.env.timezone,
+                self.surface_tilt, self.surface_azimuth, self.temperature_model,
+                pv_data.get('min_module_power'), pv_data.get('max_module_power'), pv_data.get('inverter_power_range'))
+
     def convert_index_time(self):
         """
         Convert results to current year and time resolution
@@ -286,18 +428,8 @@ class PV:
         :return: pd.Series
             PV Yield with interpolated values
         """
-        if self.env.i_step == 60:
-            pass
-        else:
-            # Create index with environment time resolution
-            pv_yield = pd.Series(index=self.env.time_series)
-            # Fill simulated values
-            for index in self.pv_yield.index:
-                pv_yield[index] = self.pv_yield[index]
-            # Interpolate values
-            pv_yield = pv_yield.interpolate(method='time')
-
-            return pv_yield
+        return self.env.resample(data=self.pv_yield,
+                                 index=self.env.time_series)
 
     def pick_pv_system(self,
                        min_module_power: float,
@@ -311,13 +443,11 @@ class PV:
         :return: list
             module, inverter, modules_per_string, strings_per_inverter
         """
-        modules = []
         # Choose modules depending on module power
-        for module in self.module_lib.columns:
-            if max_module_power > self.module_lib[module].I_mp_ref * self.module_lib[module].V_mp_ref > min_module_power:
-                modules.append(module)
+        modules = self.module_lib.select(lower=min_module_power,
+                                         upper=max_module_power)
         # Pick random module from list
-        module_name = modules[random.randint(0, (len(modules) - 1))]
+        module_name = modules[self.env.rng.integers(len(modules))]
         module = self.module_lib[module_name]
 
         # Calculate amount of modules needed to reach power
@@ -337,56 +467,48 @@ class PV:
             strings_per_inverter = 2
 
         inverters = []
+        p_dc = module.I_mp_ref * module.V_mp_ref * modules_per_string * strings_per_inverter
 
         while len(inverters) == 0:
-            for inverter in self.inverter_lib.columns:
-                if (self.inverter_lib[inverter].Paco
-                    > (module.I_mp_ref * module.V_mp_ref *
-                       modules_per_string * strings_per_inverter)) \
-                        and (self.inverter_lib[inverter].Paco
-                             < (module.I_mp_ref * module.V_mp_ref *
-                                modules_per_string * strings_per_inverter) + inverter_power_range):
-                    inverters.append(inverter)
+            inverters = self.inverter_lib.select(lower=p_dc,
+                                                 upper=p_dc + inverter_power_range)
             # Increase power range of inverter if no inverter was found
             inverter_power_range += 100
 
-        inverter_name = inverters[random.randint(0, (len(inverters) - 1))]
+        inverter_name = inverters[self.env.rng.integers(len(inverters))]
         inverter = self.inverter_lib[inverter_name]
 
         return module, module_name, inverter, inverter_name, modules_per_string, strings_per_inverter
 
     def retrieve_pvlib_library(self, component):
         """
-        Retrieve and transpose pvlib database from SQLite
+        Retrieve pvlib catalog, the SQLite table is loaded once per process
         :param component: str
             module or inverter
-        :return: pd.DataFrame
+        :return: data.catalog.Catalog
             CEC parameters
         """
-        conn = self.env.database.connect
         if component == 'module':
             table_name = 'pvlib_cec_module'
         else:
             table_name = 'pvlib_cec_inverter'
-        df = pd.read_sql_query(f'SELECT * From {table_name}', conn)
-        df = df.transpose()
-        col = df.loc['index']
-        df = df.drop(index='index')
-        df.columns = col
 
-        return df
+        return get_catalog(database=self.env.database,
+                           table=table_name)
 
     def create_config(self):
         """
         Create and write config file for system configuration
         :return: None
         """
-        self.config[self.name] = {'module': self.pv_module,
-                                  'inverter': self.inverter,
-                                  'modules_per_string': self.modules_per_string,
-                                  'strings_per_inverter': self.strings_per_inverter,
-                                  'surface_azimuth': self.surface_azimuth,
-                                  'surface_tilt': self.surface_tilt}
+        config = {'module': self.pv_module,
+                  'inverter': self.inverter,
+                  'modules_per_string': self.modules_per_string,
+                  'strings_per_inverter': self.strings_per_inverter,
+                  'surface_azimuth': self.surface_azimuth,
+                  'surface_tilt': self.surface_tilt}
+        # Scaled PV systems (normalized) have no inverter and string configuration
+        self.config[self.name] = {key: value for key, value in config.items() if value is not None}
 
         path = f'{sys.path[1]}/export/config/'
         if not os.path.exists(path):
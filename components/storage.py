@@ -1,15 +1,100 @@
 import datetime as dt
 import numpy as np
 import pandas as pd
+# MiGUEL modules
+from timeseries import create_frame
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 # TODO: Add Bleach-Acid, LiIon and Redox-Flow parameters (soc-boarders, efficiency, specific cost and co2 emissions)
 
 
+def soc_kernel(power: np.ndarray,
+               q_init: float,
+               p_n: float,
+               c: float,
+               soc_min: float,
+               soc_max: float,
+               n_charge: float,
+               n_discharge: float,
+               t_step: float,
+               initial_step: bool):
+    """
+    Calculate storage power and energy content for a whole power series
+    :param power: np.ndarray
+        charging (positive) and discharging (negative) power request [W]
+    :param q_init: float
+        energy content before the first time step [Wh]
+    :param p_n: float
+        nominal power [W]
+    :param c: float
+        nominal capacity [Wh]
+    :param soc_min: float
+        minimum state of charge
+    :param soc_max: float
+        maximum state of charge
+    :param n_charge: float
+        charging efficiency
+    :param n_discharge: float
+        discharging efficiency
+    :param t_step: float
+        time step [h]
+    :param initial_step: bool
+        first time step is the simulation start (no charging or discharging)
+    :return: list
+        power [W], energy content [Wh]
+    """
+    n = len(power)
+    p = np.zeros(n)
+    q = np.empty(n)
+    q_min = c * soc_min
+    q_max = c * soc_max
+    q_prev = q_init
+    for i in range(n):
+        p_i = 0.0
+        q_i = q_prev
+        if i > 0 or not initial_step:
+            if power[i] > 0:
+                # Charge storage
+                p_i = min(power[i], p_n)
+                q_charge = p_i * n_charge * t_step
+                if q_prev + q_charge < q_max:
+                    q_i = q_prev + q_charge
+                else:
+                    q_remain = max(q_max - q_prev, 0.0)
+                    p_i = q_remain / (t_step * n_charge)
+                    q_i = q_prev + q_remain
+            elif power[i] < 0:
+                # Discharge storage
+                p_i = max(power[i], -p_n)
+                q_discharge = p_i * n_discharge * t_step
+                if q_prev + q_discharge > q_min:
+                    q_i = q_prev + q_discharge
+                else:
+                    q_remain = max(q_prev - q_min, 0.0)
+                    # Remaining discharging power with the charging efficiency as in Storage.discharge
+                    p_i = -q_remain / (t_step * n_charge)
+                    q_i = q_prev - q_remain
+        p[i] = p_i
+        q[i] = q_i
+        q_prev = q_i
+
+    return p, q
+
+
+if njit is not None:
+    soc_kernel = njit(cache=True)(soc_kernel)
+
+
 class Storage:
     """
     Class to represent Energy Storages with a simplified Storage model
     """
 
+    columns = ['P [W]', 'Q [Wh]', 'SOC']
+
     def __init__(self,
                  env,
                  name: str = None,
@@ -88,8 +173,13 @@ class Storage:
         self.replacement_cost = sum(self.replacement_parameters[0].values())
         self.replacement_co2 = sum(self.replacement_parameters[1].values())
 
-        self.df = pd.DataFrame(columns=['P [W]', 'Q [Wh]', 'SOC'],
-                               index=self.env.time)
+        self.df = create_frame(index=self.env.time,
+                               columns=self.columns,
+                               dtype=self.env.dtype)
+        # Column positions for integer step indexing
+        self.p_col = self.df.columns.get_loc('P [W]')
+        self.q_col = self.df.columns.get_loc('Q [Wh]')
+        self.soc_col = self.df.columns.get_loc('SOC')
         self.set_initial_values()
 
         # Dict with technical data
@@ -110,7 +200,44 @@ class Storage:
         initial_time = self.df.index[0]
         self.df.at[initial_time, 'SOC'] = self.soc
         self.df.at[initial_time, 'Q [Wh]'] = self.c * self.df.at[initial_time, 'SOC']
-        self.df['P [W]'] = 0
+        self.df.loc[:, 'P [W]'] = 0
+
+    def run(self, power: np.ndarray, start: int = 0):
+        """
+        Run storage model over a power series and fill self.df
+        :param power: np.ndarray
+            charging (positive) and discharging (negative) power request [W]
+        :param start: int
+            position of the first time step of the series, the storage state is carried from position start - 1
+        :return: np.ndarray
+            storage power [W]
+        """
+        if start == 0:
+            q_init = self.soc * self.c
+        else:
+            q_init = self.df.iat[start - 1, self.q_col]
+        p, q = soc_kernel(np.ascontiguousarray(power, dtype=np.float64),
+                          float(q_init),
+                          float(self.p_n),
+                          float(self.c),
+                          float(self.soc_min),
+                          float(self.soc_max),
+                          float(self.n_charge),
+                          float(self.n_discharge),
+                          self.env.i_step / 60,
+                          start == 0)
+        if start == 0 and len(p) == len(self.df):
+            self.df = pd.DataFrame({'P [W]': p,
+                                    'Q [Wh]': q,
+                                    'SOC': q / self.c},
+                                   index=self.df.index,
+                                   dtype=self.env.dtype)
+        else:
+            if start == 0:
+                self.df = self.df.astype(self.env.dtype)
+            self.df.iloc[start:start + len(p)] = np.column_stack([p, q, q / self.c]).astype(self.env.dtype)
+
+        return p
 
     def charge(self, clock: dt.datetime, power: float):
         """
@@ -121,8 +248,11 @@ class Storage:
         :return: None
         """
         t_step = self.env.i_step
-        if clock == self.env.t_start:
+        i = self.env.time_axis.position(clock)
+        if i == 0:
             return 0
+        df = self.df
+        q_prev = df.iat[i - 1, self.q_col]
         # Check charging power
         if power <= self.p_n:
             power = power
@@ -130,35 +260,36 @@ class Storage:
             power = self.p_n
         # Calculate charging energy
         q_charge = power * self.n_charge * (t_step / 60)
-        if self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]'] + q_charge < self.c * self.soc_max:
-            self.df.at[clock, 'P [W]'] = power
-            self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]'] + q_charge
-            self.df.at[clock, 'SOC'] = self.df.at[clock, 'Q [Wh]'] / self.c
+        if q_prev + q_charge < self.c * self.soc_max:
+            df.iat[i, self.p_col] = power
+            df.iat[i, self.q_col] = q_prev + q_charge
+            df.iat[i, self.soc_col] = df.iat[i, self.q_col] / self.c
 
             return power
         else:
             # Calculate remaining energy to charge storage
-            q_remain = (self.c * self.soc_max) - self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]']
+            q_remain = (self.c * self.soc_max) - q_prev
             power = (60 * q_remain) / (t_step * self.n_charge)
             if power == 0:
-                self.df.at[clock, 'P [W]'] = 0
-                self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]']
-                self.df.at[clock, 'SOC'] = self.soc_max
+                df.iat[i, self.p_col] = 0
+                df.iat[i, self.q_col] = q_prev
+                df.iat[i, self.soc_col] = self.soc_max
 
                 return 0
             else:
-                self.df.at[clock, 'P [W]'] = power
-                self.df.at[clock, 'Q [Wh]'] = self.df.at[
-                                                  clock - dt.timedelta(minutes=self.env.i_step), 'Q [Wh]'] + q_remain
-                self.df.at[clock, 'SOC'] = self.df.at[clock, 'Q [Wh]'] / self.c
+                df.iat[i, self.p_col] = power
+                df.iat[i, self.q_col] = q_prev + q_remain
+                df.iat[i, self.soc_col] = df.iat[i, self.q_col] / self.c
 
                 return power
 
     def constant_values(self, clock):
-        if clock != self.env.t_start:
-            self.df.at[clock, 'P [W]'] = self.df.at[clock - self.env.t_step, 'P [W]']
-            self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - self.env.t_step, 'Q [Wh]']
-            self.df.at[clock, 'SOC'] = self.df.at[clock - self.env.t_step, 'SOC']
+        i = self.env.time_axis.position(clock)
+        if i != 0:
+            df = self.df
+            df.iat[i, self.p_col] = df.iat[i - 1, self.p_col]
+            df.iat[i, self.q_col] = df.iat[i - 1, self.q_col]
+            df.iat[i, self.soc_col] = df.iat[i - 1, self.soc_col]
 
     def discharge(self, clock: dt.datetime, power: float):
         """
@@ -170,8 +301,11 @@ class Storage:
         :return: power
         """
         t_step = self.env.i_step
-        if clock == self.env.t_start:
+        i = self.env.time_axis.position(clock)
+        if i == 0:
             return 0
+        df = self.df
+        q_prev = df.iat[i - 1, self.q_col]
         # Check charging power
         if power <= self.p_n:
             power = -power
@@ -179,24 +313,24 @@ class Storage:
             power = -self.p_n
         q_discharge = power * self.n_discharge * (t_step / 60)
         # Check if SOC after discharge > soc_min
-        if self.soc_min < self.df.at[clock, 'SOC'] + (q_discharge/self.c):
-            self.df.at[clock, 'P [W]'] = power
-            self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]'] + q_discharge
-            self.df.at[clock, 'SOC'] = self.df.at[clock, 'Q [Wh]'] / self.c
+        if self.soc_min < df.iat[i, self.soc_col] + (q_discharge/self.c):
+            df.iat[i, self.p_col] = power
+            df.iat[i, self.q_col] = q_prev + q_discharge
+            df.iat[i, self.soc_col] = df.iat[i, self.q_col] / self.c
             return power
         else:
             # Calculate remaining energy to discharge storage
-            q_remain = self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]'] - (self.c * self.soc_min)
+            q_remain = q_prev - (self.c * self.soc_min)
             power = -(60 * q_remain) / (t_step * self.n_charge)
             if power == 0:
-                self.df.at[clock, 'P [W]'] = 0
-                self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - dt.timedelta(minutes=t_step), 'Q [Wh]']
-                self.df.at[clock, 'SOC'] = self.soc_min
+                df.iat[i, self.p_col] = 0
+                df.iat[i, self.q_col] = q_prev
+                df.iat[i, self.soc_col] = self.soc_min
                 return 0
             else:
-                self.df.at[clock, 'P [W]'] = power
-                self.df.at[clock, 'Q [Wh]'] = self.df.at[clock - dt.timedelta(minutes=self.env.i_step), 'Q [Wh]'] - q_remain
-                self.df.at[clock, 'SOC'] = self.df.at[clock, 'Q [Wh]'] / self.c
+                df.iat[i, self.p_col] = power
+                df.iat[i, self.q_col] = q_prev - q_remain
+                df.iat[i, self.soc_col] = df.iat[i, self.q_col] / self.c
                 return power
 
     def calc_replacements(self):
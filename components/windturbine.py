@@ -1,11 +1,22 @@
-import random
 import sys
 import os
+import hashlib
 import numpy as np
 import datetime as dt
 import pandas as pd
 import windpowerlib
 from configparser import ConfigParser
+# MiGUEL modules
+from data.catalog import get_catalog
+from timeseries import create_frame, write_column
+
+# Caches shared by all WindTurbine instances of the process
+# Wind speed at hub height {(weather hash, hub height, roughness length): pd.Series}
+hub_wind_speed_cache = {}
+# Power curves {turbine_type: (wind speed, power)}
+power_curve_cache = {}
+# Power output {(weather hash, turbine_type, hub height, roughness length): pd.Series}
+power_output_cache = {}
 
 
 class WindTurbine:
@@ -13,6 +24,8 @@ class WindTurbine:
     Class to represent Wind Turbines
     """
 
+    columns = ['P [W]']
+
     def __init__(self,
                  env,
                  name: str = None,
@@ -54,14 +67,15 @@ class WindTurbine:
         self.c_invest_n = c_invest_n  # USD/kW
         self.c_op_main_n = c_op_main_n  # USD/kW
         self.c_var_n = c_var_n  # USD/kWh
-        # Location
+        # Location, the altitude is read by simulated wind turbines only
         self.longitude = self.env.longitude
         self.latitude = self.env.latitude
-        self.altitude = self.env.altitude
+        self.altitude = None
         self.roughness_length = self.env.terrain
         # DataFrame
-        self.df = pd.DataFrame(columns=['P [W]'],
-                               index=self.env.time)
+        self.df = create_frame(index=self.env.time,
+                               columns=self.columns,
+                               dtype=self.env.dtype)
         if self.selection_parameters is not None:
             self.turbine_data = self.pick_windturbine(selection_parameters=selection_parameters)
             self.hub_height = self.turbine_data.get('hub_height')
@@ -69,7 +83,7 @@ class WindTurbine:
         if wind_speed is not None:
             self.df['Wind speed [km/h]'] = wind_speed
         if wt_profile is not None:
-            self.df['P [W]'] = wt_profile
+            write_column(df=self.df, col='P [W]', values=wt_profile, dtype=self.env.dtype)
             self.p_n = p_n
         if turbine_data is not None:
             self.turbine_data = turbine_data
@@ -85,16 +99,12 @@ class WindTurbine:
             self.c_op_main = c_op_main
         self.co2_init = co2_init * self.p_n / 1000  # kg
 
-        self.turbine_df = self.get_turbine_data()
-        self.windturbine = self.create_wind_turbine()
-        self.modelchain = self.create_modelchain()
-        # Prepare weather data
-        self.annual_weather_data = self.env.wt_weather_data
-        self.annual_weather_data = self.modify_weather_data()
-        # Run windpowerlib
-        self.annual_wt_yield = self.run(weather_data=self.annual_weather_data)
-        self.wt_yield = self.annual_wt_yield.loc[self.env.time_series[0]:self.env.time_series[-1]]
-        self.df['P [W]'] = self.wt_yield
+        if wt_profile is None:
+            self.altitude = self.env.altitude
+            # Run power curve simulation
+            self.annual_wt_yield = self.run_power_curve()
+            self.wt_yield = self.annual_wt_yield.loc[self.env.time_series[0]:self.env.time_series[-1]]
+            write_column(df=self.df, col='P [W]', values=self.wt_yield, dtype=self.env.dtype)
 
         # Dict with technical data
         self.technical_data = {'Component': 'Wind Turbine',
@@ -112,74 +122,76 @@ class WindTurbine:
             self.config = ConfigParser()
             self.create_config()
 
-    def get_turbine_data(self):
+    def create_wind_turbine(self):
         """
-        Get turbine data from windpowerlib
-        :return: data
+        Create windpowerlib.WindTurbine object in self.WindTurbine
+        :return: None
         """
-        connect = self.env.database.connect
-        data = pd.read_sql_query("SELECT * FROM windpowerlib_turbine", connect)
+        wind_turbine = windpowerlib.WindTurbine(**self.turbine_data)
 
-        return data
+        return wind_turbine
 
-    def modify_weather_data(self):
+    def run_power_curve(self):
         """
-        Modify weather data for windpowerlib use
-        :return: pd.DataFrame
-            Modified weather_data
+        Simulate power output by power curve lookup over all time steps
+        Equals windpowerlib ModelChain with power_curve model without density correction,
+        turbines of the same type, hub height and terrain share one simulation
+        :return: pd.Series
+            simulation results
         """
-        # Create MultiIndex
-        arrays = [['wind_speed', 'wind_speed', 'temperature', 'temperature', 'pressure'],
-                  [10, self.hub_height, 2, self.hub_height, 0]]
-        tuples = list(zip(*arrays))
-        index = pd.MultiIndex.from_tuples(tuples,
-                                          names=['variable_name', 'height'])
-        weather_data = pd.DataFrame(np.nan,
-                                    index=self.env.time_series,
-                                    columns=index)
-        # Assign values to columns
-        weather_data['wind_speed', 10] = self.annual_weather_data['wind_speed']
-        weather_data['temperature', 2] = self.annual_weather_data['temp_air'] + 273.15
-        weather_data['pressure', 0] = self.annual_weather_data['pressure']
-        # Calculate wind speed and temperature at hub height
-        weather_data['wind_speed', self.hub_height] = self.calc_wind_speed(wind_df=weather_data['wind_speed', 10],
-                                                                           hub_height=self.hub_height)
-        weather_data['temperature', self.hub_height] = self.calc_temperature(
-                                                                        temperature_df=weather_data['temperature', 2],
-                                                                        hub_height=self.hub_height)
-        return weather_data
+        weather_key = self.weather_hash(weather_data=self.env.wt_weather_data)
+        key = (weather_key, self.turbine_data.get('turbine_type'), self.hub_height, self.roughness_length)
+        if key not in power_output_cache:
+            wind_speed_hub = self.hub_wind_speed(weather_key=weather_key)
+            curve_wind_speed, curve_power = self.power_curve()
+            power_output = np.interp(wind_speed_hub.to_numpy(dtype=float), curve_wind_speed, curve_power,
+                                     left=0, right=0)
+            power_output_cache[key] = pd.Series(power_output,
+                                                index=wind_speed_hub.index)
+        simulation_results = power_output_cache[key].copy()
 
-    def create_wind_turbine(self):
+        return simulation_results
+
+    def hub_wind_speed(self, weather_key: str):
         """
-        Create windpowerlib.WindTurbine object in self.WindTurbine
-        :return: None
+        Wind speed at hub height, shared by turbines with the same hub height and terrain
+        :param weather_key: str
+            hash of environment weather data
+        :return: pd.Series
+            wind speed at hub height
         """
-        wind_turbine = windpowerlib.WindTurbine(**self.turbine_data)
+        key = (weather_key, self.hub_height, self.roughness_length)
+        if key not in hub_wind_speed_cache:
+            hub_wind_speed_cache[key] = self.calc_wind_speed(wind_df=self.env.wt_weather_data['wind_speed'],
+                                                             hub_height=self.hub_height)
 
-        return wind_turbine
+        return hub_wind_speed_cache[key]
 
-    def create_modelchain(self):
+    def power_curve(self):
         """
-        Create windpowerlib.ModelChain object in self.ModelChain
-        :return: None
+        Power curve of turbine type from windpowerlib, loaded once per turbine type
+        :return: tuple
+            wind speed [m/s], power [W]
         """
-        modelchain = windpowerlib.modelchain.ModelChain(power_plant=self.windturbine)
+        turbine_type = self.turbine_data.get('turbine_type')
+        if turbine_type not in power_curve_cache:
+            windturbine = self.create_wind_turbine()
+            power_curve_cache[turbine_type] = (windturbine.power_curve['wind_speed'].to_numpy(dtype=float),
+                                               windturbine.power_curve['value'].to_numpy(dtype=float))
 
-        return modelchain
+        return power_curve_cache[turbine_type]
 
-    def run(self, weather_data: pd.DataFrame):
+    @staticmethod
+    def weather_hash(weather_data: pd.DataFrame):
         """
-        Run simulation
+        Hash wind speed of weather data including index
         :param weather_data: pd.DataFrame
-            weather input data
-        :return: pd.Series
-            simulation results
+        :return: str
+            hash
         """
-        density_hub = self.modelchain.density_hub(weather_df=weather_data)
-        wind_speed_hub = self.modelchain.wind_speed_hub(weather_df=weather_data)
-        simulation_results = self.modelchain.calculate_power_output(wind_speed_hub=wind_speed_hub,
-                                                                    density_hub=density_hub)
-        return simulation_results
+        values = pd.util.hash_pandas_object(weather_data['wind_speed'], index=True).values
+
+        return hashlib.sha256(values.tobytes()).hexdigest()
 
     def convert_index_time(self):
         """
@@ -210,29 +222,13 @@ class WindTurbine:
     def interpolate_values(self, df: pd.DataFrame):
         """
         Interpolate values to environment time resolution
-        :return: pd.Series
-            WT Yield with interpolated values
+        :param df: pd.DataFrame
+            hourly weather data
+        :return: pd.DataFrame
+            weather data with interpolated values
         """
-        if self.env.t_step == dt.timedelta(minutes=60):
-            pass
-        else:
-            # Create index with environment time resolution
-            wt_yield = pd.DataFrame(index=self.env.time_series,
-                                    columns=df.columns)
-            # Fill simulated values
-            wt_yield = pd.DataFrame(index=self.env.time_series, columns=df.columns)
-
-            # Fill simulated values
-            wt_yield['temp_air'] = df['temp_air'].values
-            wt_yield['relative_humidity'] = df['relative_humidity'].values
-            wt_yield['wind_speed'] = df['wind_speed'].values
-            wt_yield['wind_direction'] = df['wind_direction'].values
-            wt_yield['pressure'] = df['pressure'].values
-
-            # Interpolate values
-            wt_yield = wt_yield.astype(float).interpolate(method='time')
-
-            return wt_yield
+        return self.env.resample(data=df,
+                                 index=self.env.time_series)
 
     def calc_wind_speed(self, wind_df: pd.Series, hub_height: float):
         """
@@ -262,24 +258,6 @@ class WindTurbine:
 
         return wind_speed_hub_height
 
-    def calc_temperature(self, temperature_df: pd.Series, hub_height: float, initial_height: float = 2):
-        """
-        Calculate temperature at hub height with linear temperature gradient
-        ICAO-Standardatmosphäre (ISA). http://www.dwd.de/DE/service/lexikon/begriffe/S/Standardatmosphaere_pdf.pdf?__blob=publicationFile&v=3
-
-        :param temperature_df: pd.Series
-            temperatures at inital height
-        :param hub_height: float
-            hub height
-        :param initial_height: float
-            height of initial data (default: 2m)
-        :return: pd.Series
-            temperature at hub height
-        """
-        temperature_hub_height = temperature_df - 0.0065 * (hub_height - initial_height)
-
-        return temperature_hub_height
-
     def pick_windturbine(self, selection_parameters):
         """
         Pick wind turbine based on power range
@@ -291,57 +269,15 @@ class WindTurbine:
         # Unpack parameters
         power_min = selection_parameters[0]
         power_max = selection_parameters[1]
-        # Retrieve turbine parameters from database
-        conn = self.env.database.connect
-        df = pd.read_sql_query("SELECT * FROM windpowerlib_turbine WHERE has_power_curve = 1", conn)
-        df = df.drop('index', axis=1)
-        df = df.set_index('turbine_type')
-        # Collect wind turbines if nominal power in power range
-        turbine = []
-        for wt in df.index:
-            if power_max > df.loc[wt, 'nominal_power'] > power_min:
-                turbine.append(wt)
-        # Select random wind turbine
-        turbine_parameters = self.select_turbine(turbine=turbine, df=df)
-        windturbine = turbine_parameters[0]
-        height = turbine_parameters[1]
-        while height is None:
-            turbine_parameters = self.select_turbine(turbine=turbine, df=df)
-            windturbine = turbine_parameters[0]
-            height = turbine_parameters[1]
-        # Select hub height
-        if isinstance(df.loc[windturbine, 'hub_height'], str):
-            height_string = df.loc[windturbine, 'hub_height'].replace(' ', '')
-            height_string = height_string.replace('None', '')
-            height_string = height_string.replace(',', '.')
-            variations = height_string.split(';')
-            for height in variations:
-                if height == '':
-                    variations.remove(height)
-            hub_height = float(variations[random.randint(0, (len(variations)-1))])
-        else:
-            hub_height = df.loc[windturbine, 'hub_height']
-        p_n = df.loc[windturbine, 'nominal_power']
-
-        turbine_data = {'turbine_type': windturbine, 'hub_height': hub_height, 'p_n': p_n}
+        # Select random wind turbine with power curve and hub height
+        catalog = get_catalog(database=self.env.database,
+                              table='windpowerlib_turbine')
+        turbine_data = catalog.sample(power_min=power_min,
+                                      power_max=power_max,
+                                      rng=self.env.rng)
 
         return turbine_data
 
-    def select_turbine(self, turbine, df):
-        """
-        Select random wind turbine
-        :param turbine: list
-            turbine types
-        :param df: pd.DataFrame
-            turbine parameters
-        :return: list
-            windturbine: str, height: str or None
-        """
-        windturbine = turbine[random.randint(0, (len(turbine) - 1))]
-        height = df.loc[windturbine, 'hub_height']
-
-        return windturbine, height
-
     def create_config(self):
         """
         Create and write config file for system configuration
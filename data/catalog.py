@@ -0,0 +1,177 @@
+import sys
+import re
+import numpy as np
+import pandas as pd
+# MiGUEL modules
+from data.data import DB
+
+# Catalogs of the process {table name: Catalog}
+catalogs = {}
+
+
+class Catalog:
+    """
+    Component catalog of a MiGUEL database table
+    Parameters are kept column-oriented with one row per component,
+    components are indexed by name and sorted by their rated power
+    """
+
+    def __init__(self,
+                 database: DB,
+                 table: str,
+                 rating,
+                 name_column: str = 'index'):
+        """
+        :param database: data.DB
+            MiGUEL database
+        :param table: str
+            table name (one row per component)
+        :param rating: callable
+            function of the parameter DataFrame returning the rated power of each component [W]
+        :param name_column: str
+            column with component names
+        """
+        self.table = table
+        self.df = pd.read_sql_query(f'SELECT * From {table}', database.connect)
+        self.df = self.df.set_index(name_column)
+        self.names = self.df.index.tolist()
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.rating = np.asarray(rating(self.df), dtype=float)
+        self.order = np.argsort(self.rating, kind='stable')
+        self.sorted_rating = self.rating[self.order]
+
+    def __contains__(self, name: str):
+        return name in self.positions
+
+    def __getitem__(self, name: str):
+        return self.parameters(name=name)
+
+    def parameters(self, name: str):
+        """
+        Get parameters of component
+        :param name: str
+            component name
+        :return: pd.Series
+            parameters
+        """
+        return self.df.iloc[self.positions[name]]
+
+    def select(self, lower: float, upper: float):
+        """
+        Select components with lower < rated power < upper by binary search
+        :param lower: float
+            lower limit [W]
+        :param upper: float
+            upper limit [W]
+        :return: list
+            component names in table order
+        """
+        positions = self.select_positions(lower=lower,
+                                          upper=upper)
+
+        return [self.names[i] for i in positions]
+
+    def select_positions(self, lower: float, upper: float):
+        """
+        Select positions of components with lower < rated power < upper by binary search
+        :param lower: float
+            lower limit [W]
+        :param upper: float
+            upper limit [W]
+        :return: np.ndarray
+            component positions in table order
+        """
+        start = np.searchsorted(self.sorted_rating, lower, side='right')
+        end = np.searchsorted(self.sorted_rating, upper, side='left')
+
+        return np.sort(self.order[start:end])
+
+
+class TurbineCatalog(Catalog):
+    """
+    Wind turbine catalog of the windpowerlib turbine table
+    Hub heights are parsed once to lists of floats, turbines are indexed by nominal power
+    """
+
+    def __init__(self, database: DB):
+        """
+        :param database: data.DB
+            MiGUEL database
+        """
+        super().__init__(database=database,
+                         table='windpowerlib_turbine',
+                         rating=lambda df: df['nominal_power'].astype(float),
+                         name_column='turbine_type')
+        self.df = self.df.drop('index', axis=1)
+        self.hub_heights = [self.parse_hub_heights(value) for value in self.df['hub_height']]
+        self.valid = (self.df['has_power_curve'].to_numpy() == 1) \
+            & np.array([len(heights) > 0 for heights in self.hub_heights])
+
+    @staticmethod
+    def parse_hub_heights(value):
+        """
+        Parse hub heights of database entry, e.g. '92;108,5;None', '68-90', '75/85' or '100; side spec'
+        :param value: str or float
+            database entry
+        :return: list
+            hub heights [m]
+        """
+        if value is None:
+            return []
+        if isinstance(value, str):
+            # Numbers with decimal comma or point, any other character separates hub heights
+            return [float(height.replace(',', '.')) for height in re.findall(r'\d+(?:[.,]\d+)?', value)]
+        if np.isnan(value):
+            return []
+
+        return [float(value)]
+
+    def sample(self, power_min: float, power_max: float, rng: np.random.Generator):
+        """
+        Pick random turbine with power curve and hub height in power range
+        :param power_min: float
+            minimum nominal power [W]
+        :param power_max: float
+            maximum nominal power [W]
+        :param rng: np.random.Generator
+            random number generator
+        :return: dict
+            turbine_data {turbine_type, hub_height, p_n}
+        """
+        positions = self.select_positions(lower=power_min,
+                                          upper=power_max)
+        positions = positions[self.valid[positions]]
+        if len(positions) == 0:
+            sys.exit(f'No wind turbine with power curve between {power_min} W and {power_max} W.')
+        i = positions[rng.integers(len(positions))]
+        hub_heights = self.hub_heights[i]
+        hub_height = hub_heights[rng.integers(len(hub_heights))]
+
+        return {'turbine_type': self.names[i], 'hub_height': hub_height, 'p_n': float(self.rating[i])}
+
+
+def get_catalog(database: DB, table: str):
+    """
+    Get catalog of table, tables are loaded once per process
+    :param database: data.DB
+        MiGUEL database
+    :param table: str
+        pvlib_cec_module, pvlib_cec_inverter or windpowerlib_turbine
+    :return: Catalog
+        catalog
+    """
+    if table not in catalogs:
+        if table == 'pvlib_cec_module':
+            catalogs[table] = Catalog(database=database,
+                                      table=table,
+                                      rating=lambda df: df['I_mp_ref'].astype(float) * df['V_mp_ref'].astype(float))
+        elif table == 'pvlib_cec_inverter':
+            catalogs[table] = Catalog(database=database,
+                                      table=table,
+                                      rating=lambda df: df['Paco'].astype(float))
+        elif table == 'windpowerlib_turbine':
+            catalogs[table] = TurbineCatalog(database=database)
+        else:
+            sys.exit(f'No catalog for table {table}.')
+
+    return catalogs[table]
@@ -0,0 +1,205 @@
+import sys
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+# MiGUEL modules
+from data.data import DB
+
+
+class LocationResolver:
+    """
+    Resolve address and elevation of coordinates with Nominatim and opentopodata
+    Any object with the methods address(latitude, longitude) and elevation(latitude, longitude)
+    can replace the resolver, e.g. a local stand-in for offline runs
+    """
+
+    def __init__(self,
+                 timeout: float = 10,
+                 retries: int = 3,
+                 backoff: float = 1):
+        """
+        :param timeout: float
+            request timeout [s]
+        :param retries: int
+            number of attempts per request
+        :param backoff: float
+            waiting time before the next attempt, doubled after each attempt [s]
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def retry(self, func, *args):
+        """
+        Call function and repeat on errors
+        :param func: callable
+            request function
+        :return:
+            function result
+        """
+        wait = self.backoff
+        for attempt in range(self.retries):
+            try:
+                return func(*args)
+            except Exception as error:
+                if attempt == self.retries - 1:
+                    sys.exit(f'Location request failed after {self.retries} attempts: {error}')
+                time.sleep(wait)
+                wait *= 2
+
+    def address(self, latitude: float, longitude: float):
+        """
+        Get address from coordinates
+        :param latitude: float
+        :param longitude: float
+        :return: dict
+            {city, postcode, state, country, country_code} or None if coordinates not on land
+        """
+        def request():
+            # geopy is only required for online lookups
+            from geopy.geocoders import Nominatim
+            geolocator = Nominatim(user_agent='geoapiExercises',
+                                   timeout=self.timeout)
+            location = geolocator.reverse(f'{latitude},{longitude}')
+            if location is None:
+                return None
+            return location.raw['address']
+
+        return self.retry(request)
+
+    def elevation(self, latitude: float, longitude: float):
+        """
+        Get elevation from coordinates
+        :param latitude: float
+        :param longitude: float
+        :return: float
+            elevation [m]
+        """
+        def request():
+            url = f'https://api.opentopodata.org/v1/aster30m?locations={latitude},{longitude}'
+            result = requests.get(url, timeout=self.timeout)
+            result.raise_for_status()
+            return result.json()['results'][0]['elevation']
+
+        return self.retry(request)
+
+
+class LocationCache:
+    """
+    Coordinate keyed cache of addresses and elevations in the MiGUEL database
+    Coordinates are rounded to the given number of decimals, nearby locations share one entry
+    """
+
+    columns = ['city', 'postcode', 'state', 'country', 'country_code']
+
+    def __init__(self,
+                 database: DB,
+                 resolver=None,
+                 decimals: int = 3):
+        """
+        :param database: data.DB
+            MiGUEL database
+        :param resolver: LocationResolver
+            resolver for uncached locations (default: online LocationResolver)
+        :param decimals: int
+            decimals of rounded coordinates (3: ~100 m)
+        """
+        self.database = database
+        if resolver is None:
+            resolver = LocationResolver()
+        self.resolver = resolver
+        self.decimals = decimals
+        self.create_table()
+
+    def create_table(self):
+        """
+        Create cache table if not existing
+        :return: None
+        """
+        self.database.cursor.execute('CREATE TABLE IF NOT EXISTS location_cache ('
+                                     'latitude REAL, longitude REAL, found INTEGER, '
+                                     'city TEXT, postcode TEXT, state TEXT, country TEXT, country_code TEXT, '
+                                     'elevation REAL, PRIMARY KEY (latitude, longitude))')
+        self.database.connect.commit()
+
+    def key(self, latitude: float, longitude: float):
+        """
+        Round coordinates to cache key
+        :param latitude: float
+        :param longitude: float
+        :return: tuple
+            rounded coordinates
+        """
+        return round(latitude, self.decimals), round(longitude, self.decimals)
+
+    def read(self, latitude: float, longitude: float):
+        """
+        Read cached location
+        :param latitude: float
+        :param longitude: float
+        :return: dict
+            {found: bool or None, address: dict, elevation: float or None} or None if not cached
+        """
+        row = self.database.cursor.execute('SELECT found, city, postcode, state, country, country_code, elevation '
+                                           'FROM location_cache WHERE latitude = ? AND longitude = ?',
+                                           self.key(latitude, longitude)).fetchone()
+        if row is None:
+            return None
+        found, *address, elevation = row
+        if found is not None:
+            found = bool(found)
+        address = {col: value for col, value in zip(self.columns, address) if value is not None}
+
+        return {'found': found, 'address': address, 'elevation': elevation}
+
+    def write(self, latitude: float, longitude: float, location: dict):
+        """
+        Write location to cache
+        :param latitude: float
+        :param longitude: float
+        :param location: dict
+            {found: bool or None, address: dict, elevation: float or None}
+        :return: None
+        """
+        values = [location['address'].get(col) for col in self.columns]
+        self.database.cursor.execute('INSERT OR REPLACE INTO location_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                     (*self.key(latitude, longitude), location['found'], *values,
+                                      location['elevation']))
+        self.database.connect.commit()
+
+    def lookup(self, latitude: float, longitude: float, elevation: bool = True, offline: bool = False):
+        """
+        Get address and elevation of coordinates, uncached values are resolved concurrently
+        :param latitude: float
+        :param longitude: float
+        :param elevation: bool
+            elevation required
+        :param offline: bool
+            use cached values only, exit if not cached
+        :return: dict
+            {found: bool, address: dict, elevation: float or None}
+            found is False if coordinates not on land
+        """
+        location = self.read(latitude, longitude)
+        if location is None:
+            location = {'found': None, 'address': {}, 'elevation': None}
+        lookups = {}
+        if location['found'] is None:
+            lookups['address'] = self.resolver.address
+        if elevation and location['elevation'] is None:
+            lookups['elevation'] = self.resolver.elevation
+        if len(lookups) > 0 and offline:
+            sys.exit(f'No cached location data for latitude {latitude} and longitude {longitude}. '
+                     f'Run online once or set offline=False.')
+        if len(lookups) > 0:
+            with ThreadPoolExecutor(max_workers=len(lookups)) as executor:
+                futures = {key: executor.submit(func, latitude, longitude) for key, func in lookups.items()}
+                if 'address' in futures:
+                    address = futures['address'].result()
+                    location['found'] = address is not None
+                    location['address'] = address or {}
+                if 'elevation' in futures:
+                    location['elevation'] = futures['elevation'].result()
+            self.write(latitude, longitude, location)
+
+        return location
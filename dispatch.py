@@ -0,0 +1,262 @@
+import numpy as np
+import pandas as pd
+
+
+def analyze_unmet_load(p_res: np.ndarray, index: pd.DatetimeIndex, dt: float):
+    """
+    Analyze unmet load of a residual load series in one vectorized pass
+    :param p_res: np.ndarray
+        residual load after dispatch, positive values are not covered [W]
+    :param index: pd.DatetimeIndex
+        time index
+    :param dt: float
+        time step [h]
+    :return: dict
+        power sink series, loss of load hours, energy not supplied, peak power sink,
+        longest outage and duration curve (unmet load sorted in descending order)
+    """
+    p_res = np.asarray(p_res, dtype=float)
+    mask = p_res > 0
+    power_sink = p_res[mask]
+    if len(power_sink) > 0:
+        # Outages are runs of consecutive time steps with unmet load
+        edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+        durations = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        longest_outage = durations.max() * dt
+        peak = power_sink.max()
+    else:
+        longest_outage = 0.0
+        peak = 0.0
+
+    return {'Power sink [W]': pd.Series(power_sink, index=index[mask], name='P [W]'),
+            'Loss of load [h]': mask.sum() * dt,
+            'Energy not supplied [kWh]': power_sink.sum() * dt / 1000,
+            'Peak power sink [W]': peak,
+            'Longest outage [h]': longest_outage,
+            'Duration curve [W]': np.sort(power_sink)[::-1]}
+
+
+class ResultStore:
+    """
+    Columnar store for dispatch results
+    All columns are preallocated in one float array, every column is a contiguous NumPy array
+    Reference columns are read-only inputs kept as views of the component series instead of copies
+    """
+
+    def __init__(self,
+                 index: pd.DatetimeIndex,
+                 columns: dict,
+                 dtype=np.float64,
+                 references: list = None):
+        """
+        :param index: pd.DatetimeIndex
+            time index
+        :param columns: dict
+            {column: initial values (float or array)}
+        :param dtype: np.dtype
+            float type of the results (np.float64 or np.float32)
+        :param references: list
+            columns kept as reference to their initial values
+        """
+        if references is None:
+            references = []
+        self.index = index
+        self.columns = list(columns)
+        self.references = {col: np.asarray(columns[col]) for col in references}
+        allocated = [col for col in self.columns if col not in self.references]
+        self.positions = {col: j for j, col in enumerate(allocated)}
+        self.values = np.empty((len(self.index), len(allocated)), dtype=dtype, order='F')
+        for col in allocated:
+            self[col] = columns[col]
+
+    def __contains__(self, col: str):
+        return col in self.positions or col in self.references
+
+    def __getitem__(self, col: str):
+        if col in self.references:
+            return self.references[col]
+
+        return self.values[:, self.positions[col]]
+
+    def __setitem__(self, col: str, values):
+        if col not in self.positions:
+            raise KeyError(f'Column {col} not allocated in result store.')
+        self.values[:, self.positions[col]] = np.asarray(values, dtype=float)
+
+    def to_frame(self):
+        """
+        Create DataFrame sharing memory with the store
+        :return: pd.DataFrame
+            results
+        """
+        if len(self.references) == 0:
+            return pd.DataFrame(self.values,
+                                index=self.index,
+                                columns=self.columns,
+                                copy=False)
+
+        return pd.DataFrame({col: self[col] for col in self.columns},
+                            index=self.index,
+                            copy=False)
+
+
+class ArrayDispatch:
+    """
+    Array based dispatch engine
+    Load, RE production and component parameters are pulled into contiguous NumPy arrays,
+    the dispatch priorities run on these arrays and the results are returned as columns
+    Only the storage state is calculated step by step (components.storage.soc_kernel)
+    Basic priorities
+        1) RE self-consumption
+        2) Charge storage from RE
+        3) Discharge storage
+        4) Cover residual load from Grid or Diesel Generator
+    """
+
+    def __init__(self, operator, start: int = 0):
+        """
+        :param operator: operation.Operator
+            operator running the dispatch
+        :param start: int
+            position of the first time step of operator.store in the environment time axis
+        """
+        self.op = operator
+        self.env = operator.env
+        self.index = operator.store.index
+        self.n = len(self.index)
+        self.start = start
+        self.steps = slice(start, start + self.n)
+        self.dt = self.env.i_step / 60  # h
+        # Input arrays
+        self.load = self.op.store['P_Res [W]'].copy()
+        self.production = [component.df['P [W]'].iloc[self.steps].to_numpy(dtype=float)
+                           for component in self.env.re_supply]
+        self.grid_available = self.create_grid_availability()
+
+    def create_grid_availability(self):
+        """
+        Create boolean array with time steps the grid covers the residual load
+        :return: np.ndarray
+            grid availability
+        """
+        if not self.env.grid_connection:
+            return np.zeros(self.n, dtype=bool)
+        if self.env.blackout:
+            blackout = self.env.df['Blackout'].iloc[self.steps].to_numpy(dtype=bool)
+            return ~blackout
+
+        return np.ones(self.n, dtype=bool)
+
+    def run(self):
+        """
+        Run dispatch over the whole horizon
+        :return: dict
+            result columns {column: np.ndarray}
+        """
+        env = self.env
+        # Priority 1: RE self supply
+        supply, remain, p_res, surplus = self.re_self_supply()
+        # Priority 2 & 3: Charge storage from RE surplus, discharge storage to cover residual load
+        demand = np.where(self.grid_available & bool(env.blackout), 0, p_res)
+        charge = np.zeros(self.n)
+        es_p = []
+        for es in env.storage:
+            power = es.run(power=surplus - demand,
+                           start=self.start)
+            es_p.append(power)
+            es_charge = np.clip(power, 0, None)
+            es_discharge = np.clip(power, None, 0)
+            surplus = surplus - es_charge
+            demand = demand + es_discharge
+            charge = charge + es_charge
+            p_res = np.clip(p_res + es_discharge, 0, None)
+        re_charge = self.attribute_charge(remain=remain,
+                                          charge=charge)
+        remain = [component_remain - component_charge
+                  for component_remain, component_charge in zip(remain, re_charge)]
+        # Priority 4: Cover residual load from Grid or Diesel Generator
+        grid_p = np.where(self.grid_available, p_res, 0)
+        p_res = p_res - grid_p
+        dg_p = []
+        for dg in env.diesel_generator:
+            power = dg.run_array(power=p_res,
+                                 start=self.start)
+            dg_p.append(power)
+            p_res = np.clip(p_res - power, 0, None)
+        # Collect result columns
+        columns = {'P_Res [W]': p_res}
+        for k, component in enumerate(env.re_supply):
+            columns[f'{component.name} [W]'] = supply[k]
+            columns[f'{component.name} remain [W]'] = remain[k]
+            if len(env.storage) > 0:
+                columns[f'{component.name}_charge [W]'] = re_charge[k]
+        for j, es in enumerate(env.storage):
+            columns[f'{es.name} [W]'] = es_p[j]
+            columns[f'{es.name} soc'] = self.recorded_soc(es=es,
+                                                          p=es_p[j])
+        for m, dg in enumerate(env.diesel_generator):
+            columns[f'{dg.name} [W]'] = dg_p[m]
+        if env.grid is not None:
+            columns[f'{env.grid.name} [W]'] = grid_p
+
+        return columns
+
+    def re_self_supply(self):
+        """
+        Calculate RE self-consumption, remaining surplus and residual load for the whole horizon
+        RE components cover the residual load in the order of env.re_supply
+        :return: list
+            supply: list of np.ndarray [W], remain: list of np.ndarray [W], p_res: np.ndarray [W],
+            surplus: np.ndarray [W]
+        """
+        p_res = self.load.copy()
+        surplus = np.zeros(self.n)
+        supply = []
+        remain = []
+        for production in self.production:
+            component_supply = np.clip(np.minimum(p_res, production), 0, None)
+            component_remain = np.clip(production - p_res, 0, None)
+            p_res = np.clip(p_res - component_supply, 0, None)
+            surplus = surplus + component_remain
+            supply.append(component_supply)
+            remain.append(component_remain)
+
+        return supply, remain, p_res, surplus
+
+    def recorded_soc(self, es, p: np.ndarray):
+        """
+        SOC as recorded by the loop engine: after charging, before discharging at the same time step
+        :param es: components.storage.Storage
+            energy storage
+        :param p: np.ndarray
+            storage power [W]
+        :return: np.ndarray
+            SOC
+        """
+        q = es.df['Q [Wh]'].iloc[self.steps].to_numpy(dtype=float)
+        if self.start == 0:
+            q_first = q[0]
+        else:
+            q_first = es.df['Q [Wh]'].iat[self.start - 1]
+        q_prev = np.concatenate([[q_first], q[:-1]])
+
+        return np.where(p < 0, q_prev, q) / es.c
+
+    @staticmethod
+    def attribute_charge(remain: list, charge: np.ndarray):
+        """
+        Attribute storage charging power to RE components in the order of env.re_supply
+        :param remain: list
+            remaining RE power of each component [W]
+        :param charge: np.ndarray
+            total storage charging power [W]
+        :return: list
+            charging power of each component [W]
+        """
+        re_charge = []
+        offered = np.zeros_like(charge)
+        for component_remain in remain:
+            re_charge.append(np.clip(charge - offered, 0, component_remain))
+            offered = offered + component_remain
+
+        return re_charge
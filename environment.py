@@ -1,21 +1,59 @@
 import sys
 import os
+import copy
+import hashlib
+import pickle
 import datetime as dt
+import numpy as np
 import pandas as pd
 import pvlib
-import requests
 import urllib
+from concurrent.futures import ThreadPoolExecutor
 from configparser import ConfigParser
-from geopy.geocoders import Nominatim
 # MiGUEL Modules
 from data.data import DB
+from data.location import LocationCache
 from components.pv import PV
 from components.windturbine import WindTurbine
 from components.dieselgenerator import DieselGenerator
-from miguel_test.dieselgenerator import DieselGenerator as test_generator
 from components.grid import Grid
 from components.storage import Storage
 from components.load import Load
+from timeseries import create_frame, get_dtype
+
+
+class TimeAxis:
+    """
+    Time axis of the environment
+    Components address their state by integer position i and i-1,
+    positions of the regular environment time series are calculated from start and time step
+    """
+
+    def __init__(self, index):
+        """
+        :param index: pd.DatetimeIndex
+            environment time series
+        """
+        self.index = pd.DatetimeIndex(index)
+        self.start = self.index[0]
+        if isinstance(self.index.freq, pd.offsets.Tick):
+            self.step = pd.Timedelta(self.index.freq)
+        else:
+            # Irregular time series are addressed by index lookup
+            self.step = None
+
+    def position(self, clock: dt.datetime):
+        """
+        Get integer position of time stamp
+        :param clock: dt.datetime
+            time stamp
+        :return: int
+            position
+        """
+        if self.step is None:
+            return self.index.get_loc(clock)
+
+        return (clock - self.start) // self.step
 
 
 class Environment:
@@ -25,6 +63,8 @@ class Environment:
     Positive power values are power production (PV, DieselGenerator, WindTurbine, Grid, Storage)
     """
 
+    columns = ['P_Res [W]']
+
     def __init__(self,
                  name: str = None,
                  time: dict = None,
@@ -37,6 +77,11 @@ class Environment:
                  feed_in: bool = False,
                  diesel_generator_model: str = 'conventional',
                  weather_data: str = None,
+                 weather_cache: bool = True,
+                 offline: bool = False,
+                 location_resolver=None,
+                 seed: int = None,
+                 precision: str = 'double',
                  csv_sep: str = ',',
                  csv_decimal: str = '.'):
         """
@@ -76,6 +121,18 @@ class Environment:
             File path blackout data
         :param weather_data: str
             File path weather data
+        :param weather_cache: bool
+            Read/write PVGIS weather data from/to data/weather_cache
+        :param offline: bool
+            Use cached weather data and locations only, exit if not cached
+        :param location_resolver: data.location.LocationResolver
+            Resolver of uncached addresses and elevations (default: online lookup, not used offline)
+        :param seed: int
+            Seed of random component selection (PV modules and inverters, wind turbines)
+        :param precision: str
+            Float type of power and energy time series: 'double' (float64) or 'single' (float32)
+            Single precision halves the memory of component and dispatch results, energy and cost
+            results are accumulated in float64 and deviate by about 1e-7 (relative) from double precision
         """
         # Component Container
         self.grid = None
@@ -86,10 +143,15 @@ class Environment:
         self.re_supply = []
         self.supply_components = []
         self.storage = []
+        # Component series registry {column: (component, component column)}
+        self.series = {}
         # Parameters
         self.name = name
         self.csv_sep = csv_sep
         self.csv_decimal = csv_decimal
+        self.weather_cache = weather_cache
+        self.rng = np.random.default_rng(seed)
+        self.offline = offline
         # Time values
         self.t_start = time.get('start')
         self.t_end = time.get('end')
@@ -99,15 +161,30 @@ class Environment:
         time_parameters = self.create_df()
         self.time_series = time_parameters[0]
         self.time = time_parameters[1]
+        self.time_axis = TimeAxis(index=self.time_series)
+        # Float type of component time series
+        self.precision = precision
+        self.dtype = get_dtype(precision)
         self.year = self.t_start.year
+        # DataBase, location and weather data are loaded on first access or by build()
+        self._database = None
+        self._location_data = None
+        self._altitude = None
+        self._address = None
+        self._weather_data = None
+        self._wt_weather_data = None
+        self._monthly_weather_data = None
+        self._solar_data = None
         # Location
         self.location = location
         self.longitude = self.location.get('longitude')
         self.latitude = self.location.get('latitude')
-        self.altitude = self.get_altitude()
+        self.location_resolver = location_resolver
         self.terrain = self.location.get('terrain')
-        self.address = self.find_location()
-        self.hemisphere = self.address[-1]
+        if self.latitude < 0:
+            self.hemisphere = 'south'
+        else:
+            self.hemisphere = 'north'
         self.seasons = self.find_season()
         # Economy
         if economy is None:
@@ -135,17 +212,10 @@ class Environment:
             self.co2_diesel = ecology.get('co2_diesel')
             self.co2_grid = ecology.get('co2_grid')
         # Environment DataFrame
-        columns = ['P_Res [W]', 'PV total power [W]', 'WT total power [W]']
-        self.df = pd.DataFrame(columns=columns, index=self.time)
-        self.df['PV total power [W]'] = 0
-        self.df['WT total power [W]'] = 0
-        if weather_data is None:
-            # Include weather data for remote access
-            self.weather_data = self.get_weather_data()
-            self.wt_weather_data = self.create_wt_weather_data()
-            self.monthly_weather_data = self.create_monthly_weather_data()
-        else:
-            self.weather_data = pd.read_csv(weather_data)
+        self.df = create_frame(index=self.time,
+                               columns=self.columns,
+                               dtype=self.dtype)
+        self.weather_data_path = weather_data
 
         # Grid connection
         self.grid_connection = grid_connection
@@ -169,9 +239,6 @@ class Environment:
         # Diesel Generator
         self.diesel_generator_model = diesel_generator_model
 
-        # DataBase
-        self.database = DB()
-
         self.supply_data = pd.DataFrame(columns=['Component',
                                                  'Name',
                                                  'Nominal Power [kW]',
@@ -189,18 +256,129 @@ class Environment:
                                                   f'Operation maintenance cost [US$/a]'])
 
         self.config = ConfigParser()
+
+    def __getstate__(self):
+        # SQLite connections cannot be pickled, database is reconnected on first access after unpickling
+        state = self.__dict__.copy()
+        state['_database'] = None
+
+        return state
+
+    @property
+    def database(self):
+        if self._database is None:
+            self._database = DB()
+        return self._database
+
+    @property
+    def location_data(self):
+        if self._location_data is None:
+            location_cache = LocationCache(database=self.database,
+                                           resolver=self.location_resolver)
+            # Offline environments resolve uncached locations only with a given local resolver
+            self._location_data = location_cache.lookup(latitude=self.latitude,
+                                                        longitude=self.longitude,
+                                                        elevation=self.location.get('altitude') is None,
+                                                        offline=self.offline and self.location_resolver is None)
+        return self._location_data
+
+    @property
+    def altitude(self):
+        if self._altitude is None:
+            self._altitude = self.get_altitude()
+        return self._altitude
+
+    @property
+    def address(self):
+        if self._address is None:
+            self._address = self.find_location()
+        return self._address
+
+    @property
+    def weather_data(self):
+        if self._weather_data is None:
+            if self.weather_data_path is None:
+                # Include weather data for remote access
+                self._weather_data = self.get_weather_data()
+            else:
+                self._weather_data = pd.read_csv(self.weather_data_path)
+        return self._weather_data
+
+    @property
+    def wt_weather_data(self):
+        if self._wt_weather_data is None:
+            self._wt_weather_data = self.create_wt_weather_data()
+        return self._wt_weather_data
+
+    @property
+    def monthly_weather_data(self):
+        if self._monthly_weather_data is None:
+            self._monthly_weather_data = self.create_monthly_weather_data()
+        return self._monthly_weather_data
+
+    @property
+    def solar_data(self):
+        if self._solar_data is None:
+            self._solar_data = self.create_solar_data()
+        return self._solar_data
+
+    def build(self):
+        """
+        Load location and weather data and write config file
+        Weather data is downloaded and processed in a second thread while the location is looked up
+        :return: Environment
+            environment
+        """
+        def load_weather_data():
+            if self.weather_data_path is None:
+                return self.wt_weather_data, self.monthly_weather_data
+            return self.weather_data
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            weather = executor.submit(load_weather_data)
+            # SQLite connection is bound to the calling thread
+            self.address
+            self.altitude
+            weather.result()
         self.create_config()
 
+        return self
+
+    def copy_base(self):
+        """
+        Copy environment without supply and storage components
+        Time, location, weather data, economic and ecological parameters, load and grid connection are kept
+        :return: Environment
+            environment copy
+        """
+        env = copy.copy(self)
+        env.pv = []
+        env.diesel_generator = []
+        env.wind_turbine = []
+        env.re_supply = []
+        env.supply_components = []
+        env.storage = []
+        env.series = {}
+        columns = [col for col in ['P_Res [W]', 'Blackout'] if col in self.df.columns]
+        env.df = self.df[columns].copy()
+        env.supply_data = self.supply_data.iloc[0:0].copy()
+        env.storage_data = self.storage_data.iloc[0:0].copy()
+        if self.load is not None:
+            env.load = copy.copy(self.load)
+            env.load.env = env
+        if self.grid is not None:
+            env.add_grid(c_var_n=self.grid.c_var_n)
+
+        return env
+
     def find_location(self):
         """
         Find address based on coordinates
         :return: list
         """
-        geolocator = Nominatim(user_agent='geoapiExercises')
-        location = geolocator.reverse(f'{self.latitude},{self.longitude}')
-        if location is None:
+        if not self.location_data['found']:
             sys.exit('Coordinates not on land.')
-        address = location.raw['address']
+        address = self.location_data['address']
         city = address.get('city', '')
         if city == '':
             city = None
@@ -217,15 +395,14 @@ class Environment:
 
     def get_altitude(self):
         """
-        Get elevation from coordinates
-        :return:
+        Get elevation from coordinates, altitude of location parameters is used if given
+        :return: float
+            elevation [m]
         """
-        url = f'https://api.opentopodata.org/v1/aster30m?locations={self.latitude},{self.longitude}'
-        result = requests.get(url)
-
-        elevation = result.json()['results'][0]['elevation']
+        if self.location.get('altitude') is not None:
+            return self.location.get('altitude')
 
-        return elevation
+        return self.location_data['elevation']
 
     def find_season(self):
         if self.hemisphere == 'south':
@@ -265,13 +442,31 @@ class Environment:
             inputs: dict
             metadata: dict
         """
-        data, months_selected, inputs, metadata = pvlib.iotools.get_pvgis_tmy(latitude=self.latitude,
-                                                                              longitude=self.longitude,
-                                                                              startyear=2005,
-                                                                              outputformat='json', usehorizon=True,
-                                                                              userhorizon=None, map_variables=True,
-                                                                              timeout=30,
-                                                                              url='https://re.jrc.ec.europa.eu/api/')
+        startyear = 2005
+        usehorizon = True
+        path = self.weather_cache_path(startyear=startyear,
+                                       usehorizon=usehorizon)
+        if (self.weather_cache or self.offline) and os.path.isfile(path):
+            with open(path, 'rb') as file:
+                data, months_selected, inputs, metadata = pickle.load(file)
+        elif self.offline:
+            sys.exit(f'No cached weather data for latitude {self.latitude} and longitude {self.longitude}. '
+                     f'Run online once or set offline=False.')
+        else:
+            data, months_selected, inputs, metadata = pvlib.iotools.get_pvgis_tmy(latitude=self.latitude,
+                                                                                  longitude=self.longitude,
+                                                                                  startyear=startyear,
+                                                                                  outputformat='json',
+                                                                                  usehorizon=usehorizon,
+                                                                                  userhorizon=None, map_variables=True,
+                                                                                  timeout=30,
+                                                                                  url='https://re.jrc.ec.europa.eu/api/')
+            if self.weather_cache:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write to temporary file first, concurrent readers never see partial files
+                with open(path + '.tmp', 'wb') as file:
+                    pickle.dump((data, months_selected, inputs, metadata), file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(path + '.tmp', path)
         # Set data.index to current year
         current_year = dt.datetime.today().year
         data.index = pd.date_range(start=dt.datetime(
@@ -290,6 +485,21 @@ class Environment:
 
         return data, months_selected, inputs, metadata
 
+    def weather_cache_path(self, startyear: int, usehorizon: bool):
+        """
+        File path of cached PVGIS weather data
+        :param startyear: int
+            first year of TMY period
+        :param usehorizon: bool
+            horizon included
+        :return: str
+            path
+        """
+        key = f'{round(self.latitude, 6)},{round(self.longitude, 6)},{startyear},{usehorizon}'
+        name = hashlib.sha256(key.encode()).hexdigest()
+
+        return f'{sys.path[1]}/data/weather_cache/{name}.pkl'
+
     def create_wt_weather_data(self):
         """
         Create weather dataframe
@@ -312,27 +522,55 @@ class Environment:
         wt_hourly_data.index = pd.date_range(start=start_time,
                                              end=end_time,
                                              freq='1h')
-        wt_data = wt_hourly_data
-        # Interpolate values
-        if self.t_step == dt.timedelta(minutes=60):
-            pass
-        else:
-            # Extend index
-            wt_data = wt_data.asfreq(self.t_step)
-            wt_data.index = wt_data.index.to_pydatetime()
-            dates = []
-            for i in range(1, int(dt.timedelta(minutes=60) / self.t_step)):
-                dates.append(wt_data.index[-1] + pd.Timedelta(i * int(self.t_step / dt.timedelta(minutes=1)), 'min'))
-            dates_df = pd.DataFrame(columns=wt_data.columns,
-                                    index=dates)
-            wt_data = pd.concat([wt_data, dates_df])
-            # Interpolate values
-            for col in wt_data.columns:
-                wt_data[col] = wt_data[col].astype(float)
-                wt_data[col] = wt_data[col].interpolate(method='time')
+        wt_data = self.resample(data=wt_hourly_data)
 
         return wt_data
 
+    def resample(self, data, index: pd.DatetimeIndex = None):
+        """
+        Resample hourly data to environment time resolution
+        All columns are reindexed once and interpolated over time,
+        values after the last hour are held until the end of the index
+        :param data: pd.DataFrame or pd.Series
+            hourly data
+        :param index: pd.DatetimeIndex
+            target index (default: data period up to the end of the last hour in environment time resolution)
+        :return: pd.DataFrame or pd.Series
+            data in environment time resolution
+        """
+        if index is None:
+            if self.t_step == dt.timedelta(minutes=60):
+                return data
+            index = pd.date_range(start=data.index[0],
+                                  end=data.index[-1] + dt.timedelta(minutes=60) - self.t_step,
+                                  freq=self.t_step)
+        data = data.astype(float)
+        data = data.reindex(data.index.union(index)).interpolate(method='time')
+
+        return data.reindex(index)
+
+    def create_solar_data(self):
+        """
+        Calculate solar position, airmass and extraterrestrial radiation of the weather data time index
+        :return: pd.DataFrame
+            apparent_zenith, azimuth, airmass_relative, dni_extra
+        """
+        weather_data = self.weather_data[0]
+        location = pvlib.location.Location(latitude=self.latitude,
+                                           longitude=self.longitude,
+                                           altitude=self.altitude,
+                                           tz=self.timezone)
+        solar_position = location.get_solarposition(times=weather_data.index,
+                                                    pressure=weather_data['pressure'],
+                                                    temperature=weather_data['temp_air'])
+        airmass = location.get_airmass(solar_position=solar_position,
+                                       model='kastenyoung1989')
+        solar_data = solar_position[['apparent_zenith', 'azimuth']].copy()
+        solar_data['airmass_relative'] = airmass['airmass_relative']
+        solar_data['dni_extra'] = pvlib.irradiance.get_extra_radiation(weather_data.index)
+
+        return solar_data
+
     def create_monthly_weather_data(self):
         """
         Create monthly weather data
@@ -354,8 +592,8 @@ class Environment:
                          name=name,
                          c_var_n=c_var_n)
         self.supply_components.append(self.grid)
-        self.df[f'{name}: P [W]'] = self.grid.df['P [W]']
-        self.df[f'{name}: Blackout'] = self.grid.df['Blackout']
+        self.register_series(component=self.grid,
+                             columns=['P [W]', 'Blackout'])
         self.grid_connection = True
 
     def add_load(self,
@@ -384,15 +622,19 @@ class Environment:
                pv_profile: pd.Series = None,
                c_invest: float = None,
                c_op_main: float = None,
-               c_var_n: float = 0):
+               c_var_n: float = 0,
+               normalized: bool = False):
         """
         Add PV system to environment
+        :param normalized: bool
+            scale output of a simulated PV system with the same orientation to p_n
         :return: None
         """
         name = f'PV_{len(self.pv) + 1}'
         if pv_profile is not None:
             self.pv.append(PV(env=self,
                               name=name,
+                              p_n=p_n,
                               pv_profile=pv_profile,
                               c_invest=c_invest,
                               c_op_main=c_op_main,
@@ -404,7 +646,8 @@ class Environment:
                               pv_data=pv_data,
                               c_invest=c_invest,
                               c_op_main=c_op_main,
-                              c_var_n=c_var_n))
+                              c_var_n=c_var_n,
+                              normalized=normalized))
         elif pv_data is not None:
             self.pv.append(PV(env=self,
                               name=name,
@@ -414,11 +657,42 @@ class Environment:
                               c_var_n=c_var_n))
         else:
             pass
-        self.re_supply.append(self.pv[-1])
-        self.supply_components.append(self.pv[-1])
-        self.df[f'{name}: P [W]'] = self.pv[-1].df['P [W]']
-        self.df['PV total power [W]'] += self.df[f'{name}: P [W]']
-        self.add_component_data(component=self.pv[-1],
+        self.register_pv(pv=self.pv[-1])
+
+    def add_pv_batch(self, specs: list):
+        """
+        Add several PV systems (e.g. east/west or multi-roof sites)
+        Solar position, airmass and extraterrestrial radiation are calculated once for all PV systems,
+        transposition, cell temperature, single diode and inverter model run per PV system
+        :param specs: list
+            list of dicts with parameters of add_pv
+            {p_n: float, pv_data: dict, c_invest: float, c_op_main: float, c_var_n: float}
+        :return: None
+        """
+        for spec in specs:
+            pv = PV(env=self,
+                    name=f'PV_{len(self.pv) + 1}',
+                    p_n=spec.get('p_n'),
+                    pv_data=spec.get('pv_data'),
+                    c_invest=spec.get('c_invest'),
+                    c_op_main=spec.get('c_op_main'),
+                    c_var_n=spec.get('c_var_n', 0),
+                    run_model=False)
+            pv.set_yield(annual_pv_yield=pv.run_shared(solar_data=self.solar_data))
+            self.pv.append(pv)
+            self.register_pv(pv=pv)
+
+    def register_pv(self, pv: PV):
+        """
+        Add PV system to supply components and component series
+        :param pv: components.pv.PV
+            PV system
+        :return: None
+        """
+        self.re_supply.append(pv)
+        self.supply_components.append(pv)
+        self.register_series(component=pv)
+        self.add_component_data(component=pv,
                                 supply=True)
 
     def add_wind_turbine(self,
@@ -445,8 +719,7 @@ class Environment:
                                              c_var_n=c_var_n))
         self.re_supply.append(self.wind_turbine[-1])
         self.supply_components.append(self.wind_turbine[-1])
-        self.df[f'{name}: P [W]'] = self.wind_turbine[-1].df['P [W]']
-        self.df['WT total power [W]'] += self.df[f'{name}: P [W]']
+        self.register_series(component=self.wind_turbine[-1])
         # self.add_component_data(component=self.wind_turbine[-1], supply=True)
 
     def add_diesel_generator(self,
@@ -467,7 +740,7 @@ class Environment:
                                                      c_invest=c_invest,
                                                      c_op_main=c_op_main,
                                                      c_var_n=c_var_n))
-        self.df[f'{name}: P [W]'] = self.diesel_generator[-1].df['P [W]']
+        self.register_series(component=self.diesel_generator[-1])
         self.supply_components.append(self.diesel_generator[-1])
         self.add_component_data(component=self.diesel_generator[-1],
                                 supply=True)
@@ -498,10 +771,82 @@ class Environment:
                                     c_invest=c_invest,
                                     c_op_main=c_op_main,
                                     c_var_n=c_var_n))
-        self.df[f'{name}: P [W]'] = self.storage[-1].df['P [W]']
+        self.register_series(component=self.storage[-1])
         self.add_component_data(component=self.storage[-1],
                                 supply=False)
 
+    def register_series(self, component, columns: list = None):
+        """
+        Register component series as environment columns '{component name}: {column}'
+        The series stay in component.df and are looked up on access
+        :param component: object
+            component with time series df
+        :param columns: list
+            component columns (default: ['P [W]'])
+        :return: None
+        """
+        if columns is None:
+            columns = ['P [W]']
+        for col in columns:
+            self.series[f'{component.name}: {col}'] = (component, col)
+
+    def remove_series(self, component):
+        """
+        Remove component series from registry
+        :param component: object
+            registered component
+        :return: None
+        """
+        self.series = {col: (registered, component_col) for col, (registered, component_col) in self.series.items()
+                       if registered is not component}
+
+    def get_series(self, col: str):
+        """
+        Get environment column, component series and total power are resolved on access
+        :param col: str
+            column of self.df, registered component column or 'PV total power [W]' / 'WT total power [W]'
+        :return: pd.Series
+            time series
+        """
+        if col in self.series:
+            component, component_col = self.series[col]
+            return component.df[component_col]
+        elif col == 'PV total power [W]':
+            return self.total_power(components=self.pv,
+                                    name=col)
+        elif col == 'WT total power [W]':
+            return self.total_power(components=self.wind_turbine,
+                                    name=col)
+        else:
+            return self.df[col]
+
+    def total_power(self, components: list, name: str = None):
+        """
+        Sum power of components
+        :param components: list
+            components with column 'P [W]'
+        :param name: str
+            series name
+        :return: pd.Series
+            total power [W]
+        """
+        total = np.zeros(len(self.df), dtype=self.dtype)
+        for component in components:
+            total += component.df['P [W]'].to_numpy()
+
+        return pd.Series(total, index=self.df.index, name=name)
+
+    def view(self, columns: list):
+        """
+        Collect environment columns in one DataFrame, e.g. for plots
+        :param columns: list
+            columns (see get_series)
+        :return: pd.DataFrame
+            time series
+        """
+        return pd.DataFrame({col: self.get_series(col) for col in columns},
+                            index=self.df.index)
+
     def add_component_data(self,
                            component,
                            supply: bool):
@@ -512,12 +857,13 @@ class Environment:
             Object of create Component
         :return: None
         """
+        technical_data = pd.DataFrame([component.technical_data])
         if supply is True:
-            self.supply_data = self.supply_data._append(component.technical_data,
-                                                        ignore_index=True)
+            self.supply_data = pd.concat([self.supply_data, technical_data],
+                                         ignore_index=True)
         else:
-            self.storage_data = self.storage_data._append(component.technical_data,
-                                                          ignore_index=True)
+            self.storage_data = pd.concat([self.storage_data, technical_data],
+                                          ignore_index=True)
 
     def calc_energy_consumption_parameters(self):
         """
@@ -525,7 +871,7 @@ class Environment:
         :return: list
             energy_consumption [kWh], peak_load [W]
         """
-        energy_consumption = self.df['P_Res [W]'].sum() * self.i_step / 60 / 1000
+        energy_consumption = np.nansum(self.df['P_Res [W]'].to_numpy(dtype=float)) * self.i_step / 60 / 1000
         peak_load = self.df['P_Res [W]'].max()
 
         return energy_consumption, peak_load
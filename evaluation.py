@@ -19,7 +19,16 @@ class Evaluation:
 
     def __init__(self,
                  env: Environment = None,
-                 operator: Operator = None):
+                 operator: Operator = None,
+                 export: bool = True):
+        """
+        :param env: env.Environment
+            system environment
+        :param operator: operation.Operator
+            operator after dispatch
+        :param export: bool
+            export evaluation to csv-file
+        """
         self.env = env
         self.op = operator
         # Evaluation df
@@ -56,9 +65,10 @@ class Evaluation:
         self.calc_lifetime_energy_supply()
         self.calc_system_values()
         self.calc_lcoe()
-        self.evaluation_df.to_csv(sys.path[1] + '/export/system_evaluation.csv',
-                                  sep=self.env.csv_sep,
-                                  decimal=self.env.csv_decimal)
+        if export:
+            self.evaluation_df.to_csv(sys.path[1] + '/export/system_evaluation.csv',
+                                      sep=self.env.csv_sep,
+                                      decimal=self.env.csv_decimal)
 
     def build_evaluation_df(self):
         """
@@ -86,7 +96,7 @@ class Evaluation:
         :return: float
             energy_consumption [kWh]
         """
-        energy_consumption = self.env.df['P_Res [W]'].sum() * self.env.i_step / 60 / 1000
+        energy_consumption = np.nansum(self.env.df['P_Res [W]'].to_numpy(dtype=float)) * self.env.i_step / 60 / 1000
 
         self.evaluation_df.loc['System', 'Annual energy supply [kWh/a]'] = int(energy_consumption)
 
@@ -144,18 +154,18 @@ class Evaluation:
         :return: None
         """
         col = f'{component.name} [W]'
-        energy_supply = self.op.df[col].sum() * self.env.i_step / 60 / 1000
+        energy_supply = self.op.column_sum(col) * self.env.i_step / 60 / 1000
         if isinstance(component, PV):
             if len(self.env.storage) == 0:
                 charge = 0
             else:
-                charge = self.op.df[f'{component.name}_charge [W]'].sum() * self.env.i_step / 60 / 1000
+                charge = self.op.column_sum(f'{component.name}_charge [W]') * self.env.i_step / 60 / 1000
             self.pv_energy_supply[component.name] = energy_supply + charge
         elif isinstance(component, WindTurbine):
             if len(self.env.storage) == 0:
                 charge = 0
             else:
-                charge = self.op.df[f'{component.name}_charge [W]'].sum() * self.env.i_step / 60 / 1000
+                charge = self.op.column_sum(f'{component.name}_charge [W]') * self.env.i_step / 60 / 1000
             self.wt_energy_supply[component.name] = energy_supply + charge
         elif isinstance(component, Grid):
             charge = 0
@@ -174,12 +184,8 @@ class Evaluation:
         """
         for es in self.env.storage:
             col = es.name + ' [W]'
-            es_charge = int(sum(np.where(self.op.df[col] > 0,
-                                         self.op.df[col],
-                                         0).tolist()) * self.env.i_step / 60 / 1000)
-            es_discharge = int(sum(np.where(self.op.df[col] < 0,
-                                            self.op.df[col],
-                                            0).tolist()) * self.env.i_step / 60 / 1000)
+            es_charge = int(self.op.column_sum(col, part='positive sum') * self.env.i_step / 60 / 1000)
+            es_discharge = int(self.op.column_sum(col, part='negative sum') * self.env.i_step / 60 / 1000)
             self.evaluation_df.loc[es.name, 'Annual energy supply [kWh/a]'] = -es_discharge
             self.storage_energy_supply[f'{es.name}_charge'] = es_charge
             self.storage_energy_supply[f'{es.name}_discharge'] = es_discharge
@@ -299,7 +305,7 @@ class Evaluation:
         else:
             if self.env.grid_connection:
                 if self.env.feed_in:
-                    annual_revenues = self.op.df[f'{component.name} Feed in [US$]'].sum()
+                    annual_revenues = self.op.column_sum(f'{component.name} Feed in [US$]')
                 else:
                     annual_revenues = 0
             else:
@@ -1,5 +1,4 @@
 import sys
-import pandas as pd
 import threading
 from global_land_mask import globe
 from PyQt5.QtWidgets import *
@@ -13,6 +12,7 @@ from report.report import Report
 from components.pv import PV
 from components.windturbine import WindTurbine
 from components.dieselgenerator import DieselGenerator
+from data.catalog import get_catalog
 import gui.gui_func as gui_func
 from gui.gui_projectsetup import ProjectSetup
 from gui.gui_environment import EnergySystem
@@ -224,29 +224,21 @@ class TabWidget(QWidget):
             row = tab.overview.currentIndex().row()
             # Check if component has been selected
             if row != -1:
-                name = component[row].name
                 comp = component[row]
                 # Delete item from environment
-                if isinstance(comp, PV):
-                    self.env.df['PV total power [W]'] \
-                        = self.env.df['PV total power [W]'] - self.env.df[f'{name}: P [W]']
-                    self.env.re_supply.remove(comp)
-                    self.env.supply_components.remove(comp)
-                elif isinstance(comp, WindTurbine):
-                    self.env.df['WT total power [W]'] \
-                        = self.env.df['WT total power [W]'] - self.env.df[f'{name}: P [W]']
+                if isinstance(comp, (PV, WindTurbine)):
                     self.env.re_supply.remove(comp)
                     self.env.supply_components.remove(comp)
                 elif isinstance(comp, DieselGenerator):
                     self.env.supply_components.remove(comp)
-                self.env.df = self.env.df.drop(columns=[f'{name}: P [W]'])
+                self.env.remove_series(component=comp)
                 del (component[row])
                 # Remove item from QListView
                 tab.component_df = tab.component_df.drop(row, axis=0)
                 gui_func.update_listview(tab=tab,
                                          df=tab.component_df)
                 # Remove item from dispatch listview
-                dispatch_row = tabs(8).component_df.index[tabs(8).component_df['Name'] == name].to_list()[0]
+                dispatch_row = tabs(8).component_df.index[tabs(8).component_df['Name'] == comp.name].to_list()[0]
                 tabs(8).component_df = tabs(8).component_df.drop(dispatch_row,
                                                                  axis=0)
                 gui_func.update_listview(tab=tabs(8), df=tabs(8).component_df)
@@ -468,6 +460,7 @@ class TabWidget(QWidget):
                                        feed_in=feed_in,
                                        csv_decimal=decimal,
                                        csv_sep=sep)
+                self.env.build()
                 # Update folium map
                 tab.update_map(latitude=location['latitude'],
                                longitude=location['longitude'],
@@ -673,9 +666,11 @@ class TabWidget(QWidget):
     def create_operator(self):
         """
         Create Operator and run Dispatch
+        Array dispatch reuses cached RE self supply of unchanged components
         :return: None
         """
-        self.operator = Operator(env=self.env)
+        self.operator = Operator(env=self.env,
+                                 engine='array')
 
     def evaluate_system(self, tab: Qt.Widget):
         """
@@ -708,31 +703,14 @@ class TabWidget(QWidget):
         :return: None
         """
         tab = self.tabs.widget(4)
-        conn = self.env.database.connect
         # Modules
-        module = 'pvlib_cec_module'
-        inverter = 'pvlib_cec_inverter'
-        module_df = pd.read_sql_query(f'SELECT * From {module}', conn)
-        module_df = module_df.transpose()
-        module_col = module_df.loc['index']
-        module_df = module_df.drop(index='index')
-        module_df.columns = module_col
-        modules = module_df.columns
-        for x in modules:
-            x.replace('_', ' ')
-        tab.module_lib = modules
+        tab.module_lib = get_catalog(database=self.env.database,
+                                     table='pvlib_cec_module').names
         # Add module lib to ComboBox
         tab.module.addItems(tab.module_lib)
         # Inverter
-        inverter_df = pd.read_sql_query(f'SELECT * From {inverter}', conn)
-        inverter_df = inverter_df.transpose()
-        inverter_col = inverter_df.loc['index']
-        inverter_df = inverter_df.drop(index='index')
-        inverter_df.columns = inverter_col
-        inverters = inverter_df.columns
-        for x in inverters:
-            x.replace('_', ' ')
-        tab.inverter_lib = inverters
+        tab.inverter_lib = get_catalog(database=self.env.database,
+                                       table='pvlib_cec_inverter').names
         tab.inverter.addItems(tab.inverter_lib)
 
     def windpowerlib_database(self):
@@ -741,12 +719,10 @@ class TabWidget(QWidget):
         :return:
         """
         tab = self.tabs.widget(5)
-        conn = self.env.database.connect
-        df = pd.read_sql_query("SELECT * FROM windpowerlib_turbine WHERE has_power_curve = 1", conn)
-        df = df.drop('index', axis=1)
-        df = df.set_index('turbine_type')
-        windturbines = df.index.tolist()
-        tab.turbine_lib = windturbines
+        catalog = get_catalog(database=self.env.database,
+                              table='windpowerlib_turbine')
+        has_power_curve = catalog.df['has_power_curve'].to_numpy() == 1
+        tab.turbine_lib = [name for name, valid in zip(catalog.names, has_power_curve) if valid]
         tab.turbine.addItems(tab.turbine_lib)
 
     def plot_monthly_weather_data(self):
@@ -51,15 +51,16 @@ def demonstration(grid_connection=True):
                               blackout_data=None,
                               csv_decimal=',',
                               csv_sep=';')
+    environment.build()
     # Add load profile from csv-file
     environment.add_load(annual_consumption=150000, ref_profile='L0')  # kWh
-    # Add PV system
-    environment.add_pv(p_n=30000,
-                       pv_data={'surface_tilt': 20, 'surface_azimuth': 90, 'min_module_power': 300,
-                                'max_module_power': 400, 'inverter_power_range': 2500})
-    environment.add_pv(p_n=30000,
-                       pv_data={'surface_tilt': 20, 'surface_azimuth': 270, 'min_module_power': 300,
-                                'max_module_power': 400, 'inverter_power_range': 2500})
+    # Add PV systems (east/west)
+    environment.add_pv_batch(specs=[{'p_n': 30000,
+                                     'pv_data': {'surface_tilt': 20, 'surface_azimuth': 90, 'min_module_power': 300,
+                                                 'max_module_power': 400, 'inverter_power_range': 2500}},
+                                    {'p_n': 30000,
+                                     'pv_data': {'surface_tilt': 20, 'surface_azimuth': 270, 'min_module_power': 300,
+                                                 'max_module_power': 400, 'inverter_power_range': 2500}}])
     # environment.add_pv(pv_data={'surface_tilt': 20, 'surface_azimuth': 0, 'pv_module': 'ET_Solar_Industry_ET_M672320WW',
     #                             'inverter': 'SMA_America__STP_62_US_41__480V_', 'modules_per_string': 94.0,
     #                             'strings_per_inverter': 2})
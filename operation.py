@@ -5,13 +5,19 @@ import pandas as pd
 from pathlib import Path
 # MiGUEL modules
 from environment import Environment
+from dispatch import ArrayDispatch, ResultStore, analyze_unmet_load
+from timeseries import get_dtype
 from components.pv import PV
 from components.windturbine import WindTurbine
 from components.storage import Storage
 from components.grid import Grid
-from components.Electrolyser import Electrolyser
-from components.Brennstoffzelle import FuelCell
-from components.H2_Storage import H2Storage
+# Hydrogen components are optional, the dispatch runs without them if they are not installed
+try:
+    from components.Electrolyser import Electrolyser
+    from components.Brennstoffzelle import FuelCell
+    from components.H2_Storage import H2Storage
+except ImportError:
+    Electrolyser = FuelCell = H2Storage = None
 import matplotlib.pyplot as plt
 
 
@@ -21,12 +27,40 @@ class Operator:
     """
 
     def __init__(self,
-                 env: Environment):
+                 env: Environment,
+                 engine: str = 'loop',
+                 chunk: str = None,
+                 precision: str = None,
+                 export: bool = True):
         """
         :param env: env.Environment
             system environment
+        :param engine: str
+            dispatch engine ('loop': time step iteration on DataFrame, 'array': array based dispatch)
+        :param chunk: str
+            pandas frequency to stream the array dispatch in chunks (e.g. 'MS' for one month),
+            None dispatches the whole horizon at once
+        :param precision: str
+            float type of the results: 'double' or 'single' (default: env.precision)
+            single precision stores results as float32 and keeps RE production columns as references
+            to the component series, sums are accumulated in float64
+        :param export: bool
+            export results to csv-files after dispatch
         """
         self.env = env
+        if engine not in ['loop', 'array']:
+            sys.exit(f'Dispatch engine {engine} not available.')
+        if chunk is not None and engine != 'array':
+            sys.exit('Chunked dispatch requires the array engine.')
+        if precision is None:
+            precision = env.precision
+        if precision == 'single' and engine != 'array':
+            sys.exit('Single precision requires the array engine.')
+        self.engine = engine
+        self.precision = precision
+        self.dtype = get_dtype(precision)
+        self.chunk = chunk
+        self.aggregates = None
         self.energy_data = self.env.calc_energy_consumption_parameters()
         self.energy_consumption = self.energy_data[0]
         self.peak_load = self.energy_data[1]
@@ -35,66 +69,108 @@ class Operator:
         self.power_sink = pd.DataFrame(columns=['Time', 'P [W]'])
         self.power_sink = self.power_sink.set_index('Time')
         self.power_sink_max = None
-        self.df = self.build_df()
+        self._df = None
+        self.store = self.build_store()
         self.dispatch_finished = False
         self.dispatch()
-        self.export_data()
+        if export:
+            self.export_data()
 
     ''' Basic Functions'''
 
-    def build_df(self):
+    @property
+    def df(self):
         """
-        Assign columns to pd.DataFrame
+        Dispatch results, built from self.store on first access
         :return: pd.DataFrame
             DataFrame with component columns
         """
-        df = pd.DataFrame(columns=['Load [W]', 'P_Res [W]','PV_Production [W]'],
-                          index=self.env.time)
-        df['Load [W]'] = self.env.df['P_Res [W]'].round(2)
-        df['P_Res [W]'] = self.env.df['P_Res [W]'].round(2)
-        df['PV_Production'] = self.env.df['PV total power [W]'].round(2)
-        #df['P_Res [W]'] = self.env.df['PV total power [W]'].round(2) - self.env.df['P_Res [W]'].round(2)
-        #df[['Load [W]', 'P_Res [W]']].to_csv("DF_OPER_1.csv")
-        #print("DEBUG: Initialisierung des DataFrame")
-        #print("DEBUG: PV-Produktion:", self.env.df['PV total power [W]'].head(5))
-        #print("DEBUG: P_Res vor Simulation:", df['P_Res [W]'].head(5).round(2))
-        #print("DEBUG: Load:", self.env.df['P_Res [W]'].head(5).round(2))
-        # df.to_csv("data frame Operation bevor Batterie und wasserstoff.csv")
-        if self.env.grid_connection:
-            if self.env.blackout:
-                df['Blackout'] = self.env.df['Blackout']
-        for pv in self.env.pv:
-            pv_col = f'{pv.name} [W]'
-            df[pv_col] = 0
-            df[f'{pv.name} production [W]'] = pv.df['P [W]']
-        for wt in self.env.wind_turbine:
-            wt_col = f'{wt.name} [W]'
-            df[wt_col] = 0
-            df[f'{wt.name} production [W]'] = wt.df['P [W]']
-        for es in self.env.storage:
-            es_col = f'{es.name} [W]'
-            df[es_col] = 0
-            df[f'{es.name}_capacity [Wh]'] = np.nan
-        for el in self.env.electrolyser:
-            el_col = f'{el.name} [W]'
-            df[el_col] = 0
-            df[f'{el.name} power [W]'] = el.df_electrolyser['P[W]']
-        for hstr in self.env.H2Storage:
-            hstr_col = f'{hstr.name} [W]'
-            df[hstr_col] = 0
-            df[f'{hstr.name}: H2 Outflow [kg]'] = hstr.hstorage_df['H2 Outflow [kg]']
-            df[f'{hstr.name}: H2 Inflow [kg]'] = hstr.hstorage_df['H2 Inflow [kg]']
-            df[f'{hstr.name} _Storage Level [kg]'] = hstr.hstorage_df['Storage Level [kg]']
-        #for fc in self.env.fuel_cell:
-            #fc_col = f'{fc.name} [W]'
-            #df[fc_col] = 0
-            #df[f'{fc.name} Power[W]'] = fc.df_fc['Power Output [W]']
-
-        if self.env.grid is not None:  # sicherstellen dass das Grid nur dann in DF AAUFGENOMMEN WIRD;Wenn ein Netz existiert
-            grid_col = f'{self.env.grid.name} [W]'
-            df[grid_col] = 0
-
-        return df
+        if self._df is None:
+            if self.store is None:
+                # Streamed results are only available on disk
+                self._df = pd.read_csv(f'{sys.path[1]}/export/operator.csv',
+                                       index_col=0,
+                                       parse_dates=True,
+                                       sep=self.env.csv_sep,
+                                       decimal=self.env.csv_decimal)
+            else:
+                self._df = self.store.to_frame()
+
+        return self._df
+
+    def column_sum(self, col: str, part: str = 'sum'):
+        """
+        Sum of result column, taken from the running aggregates of a chunked dispatch if available
+        :param col: str
+            column name
+        :param part: str
+            'sum', 'positive sum' or 'negative sum'
+        :return: float
+            column sum
+        """
+        if self.aggregates is not None:
+            return self.aggregates.at[col, part]
+        values = self.df[col].to_numpy(dtype=float)
+        if part == 'positive sum':
+            values = np.clip(values, 0, None)
+        elif part == 'negative sum':
+            values = np.clip(values, None, 0)
+
+        return np.nansum(values)
+
+    def build_store(self, steps: slice = slice(None)):
+        """
+        Preallocate result columns for every series the dispatch writes
+        :param steps: slice
+            time step positions covered by the store
+        :return: dispatch.ResultStore
+            columnar result store
+        """
+        env = self.env
+        references = []
+        columns = {'Load [W]': env.df['P_Res [W]'].iloc[steps].round(2),
+                   'P_Res [W]': env.df['P_Res [W]'].iloc[steps].round(2),
+                   'PV_Production': env.get_series('PV total power [W]').iloc[steps].round(2)}
+        if env.grid_connection:
+            if env.blackout:
+                columns['Blackout'] = env.df['Blackout'].iloc[steps]
+        for component in env.re_supply:
+            columns[f'{component.name} [W]'] = 0
+            columns[f'{component.name} production [W]'] = component.df['P [W]'].iloc[steps]
+            if self.precision == 'single':
+                references.append(f'{component.name} production [W]')
+            columns[f'{component.name} remain [W]'] = 0
+            if len(env.storage) > 0:
+                columns[f'{component.name}_charge [W]'] = 0
+            if env.grid_connection and env.feed_in:
+                columns[f'{component.name} Feed in [W]'] = 0
+                columns[f'{component.name} Feed in [{env.currency}]'] = 0
+        for es in env.storage:
+            columns[f'{es.name} [W]'] = 0
+            columns[f'{es.name} soc'] = np.nan
+        for dg in env.diesel_generator:
+            columns[f'{dg.name} [W]'] = 0
+        # Hydrogen components (only available in environments providing them)
+        for el in getattr(env, 'electrolyser', []):
+            columns[f'{el.name} [W]'] = 0
+            columns[f'{el.name} power [W]'] = el.df_electrolyser['P[W]'].iloc[steps]
+            columns[f'{el.name} Hydrogen [kg]'] = np.nan
+        for hstr in getattr(env, 'H2Storage', []):
+            columns[f'{hstr.name} [W]'] = 0
+            columns[f'{hstr.name}: H2 Outflow [kg]'] = hstr.hstorage_df['H2 Outflow [kg]'].iloc[steps]
+            columns[f'{hstr.name}: H2 Inflow [kg]'] = hstr.hstorage_df['H2 Inflow [kg]'].iloc[steps]
+            columns[f'{hstr.name} _Storage Level [kg]'] = hstr.hstorage_df['Storage Level [kg]'].iloc[steps]
+            columns[f'{hstr.name} SOC[%]'] = np.nan
+            columns[f'{hstr.name} level [kg]'] = np.nan
+        for fc in getattr(env, 'fuel_cell', []):
+            columns[f'{fc.name} [W]'] = 0
+        if env.grid is not None:
+            columns[f'{env.grid.name} [W]'] = 0
+
+        return ResultStore(index=env.time_axis.index[steps],
+                           columns=columns,
+                           dtype=self.dtype,
+                           references=references)
 
     ''' Simulation '''
 
@@ -106,6 +182,12 @@ class Operator:
             2) Charge storage from RE
         :return: None
         """
+        if self.chunk is not None:
+            self.stream_dispatch()
+            return
+        if self.engine == 'array':
+            self.array_dispatch()
+            return
         pd.set_option('display.max_rows', 100)
         pd.set_option('display.max_columns', 10)
 
@@ -182,18 +264,7 @@ class Operator:
             col = pv.name + ' [W]'
             self.df[col] = np.where(self.df[col] < 0, 0, self.df[col])
 
-        if self.env.feed_in:
-            for component in env.re_supply:
-                self.feed_in(component=component)
-        power_sink = self.check_dispatch()
-        self.power_sink = pd.concat([self.power_sink, power_sink])
-        if len(self.power_sink) == 0:
-            self.power_sink_max = 0
-            self.system_covered = True
-        else:
-            self.power_sink_max = float(self.power_sink.max().iloc[0])
-            self.system_covered = False
-        self.dispatch_finished = True
+        self.finish_dispatch()
         for fc in env.fuel_cell:
             #self.df= self.df.iloc[0:2000]
             self.df[['Load [W]', 'P_Res [W]', f'{es.name} [W]',f'{es.name} soc', f'{el.name} [W]',f'{el.name} Hydrogen [kg]', f'{h2_storage.name} level [kg]', f'{fc.name} [W]']].to_csv("DF_OPER_2.csv")
@@ -237,25 +308,126 @@ class Operator:
         '''
 
 
+    def array_dispatch(self):
+        """
+        Run dispatch with array based engine and write results to the preallocated columns of self.store
+        :return: None
+        """
+        results = ArrayDispatch(operator=self).run()
+        for col, values in results.items():
+            self.store[col] = values
+        self.finish_dispatch()
+
+    def stream_dispatch(self):
+        """
+        Run array based dispatch chunk by chunk
+        Storage state is carried across chunk boundaries, the results of each chunk are exported to
+        export/operator.csv and only running aggregates are kept in memory
+        :return: None
+        """
+        env = self.env
+        index = env.time_axis.index
+        chunk_starts = index.searchsorted(pd.date_range(start=index[0],
+                                                        end=index[-1],
+                                                        freq=self.chunk))
+        bounds = np.unique(np.concatenate([[0], chunk_starts, [len(index)]]))
+        Path(f'{sys.path[1]}/export').mkdir(parents=True, exist_ok=True)
+        path = f'{sys.path[1]}/export/operator.csv'
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            self.store = self.build_store(steps=slice(start, end))
+            self._df = None
+            results = ArrayDispatch(operator=self,
+                                    start=start).run()
+            for col, values in results.items():
+                self.store[col] = values
+            self.collect_results()
+            self.update_aggregates()
+            self.df.to_csv(path,
+                           sep=env.csv_sep,
+                           decimal=env.csv_decimal,
+                           mode='w' if start == 0 else 'a',
+                           header=start == 0)
+        self.store = None
+        self._df = None
+        self.finish_dispatch()
+
+    def update_aggregates(self):
+        """
+        Add results in self.store to running aggregates
+        :return: None
+        """
+        values = np.column_stack([self.store[col] for col in self.store.columns]).astype(float)
+        aggregates = pd.DataFrame({'sum': np.nansum(values, axis=0),
+                                   'positive sum': np.nansum(np.clip(values, 0, None), axis=0),
+                                   'negative sum': np.nansum(np.clip(values, None, 0), axis=0),
+                                   'max': np.fmax.reduce(values, axis=0),
+                                   'min': np.fmin.reduce(values, axis=0)},
+                                  index=self.store.columns)
+        if self.aggregates is None:
+            self.aggregates = aggregates
+        else:
+            sums = ['sum', 'positive sum', 'negative sum']
+            self.aggregates[sums] += aggregates[sums]
+            self.aggregates['max'] = np.fmax(self.aggregates['max'], aggregates['max'])
+            self.aggregates['min'] = np.fmin(self.aggregates['min'], aggregates['min'])
+
+    def collect_results(self):
+        """
+        Calculate feed-in and power sink of the results in self.store
+        :return: None
+        """
+        env = self.env
+        if self.env.feed_in:
+            for component in env.re_supply:
+                self.feed_in(component=component)
+        power_sink = self.check_dispatch()
+        self.power_sink = pd.concat([self.power_sink, power_sink])
+
+    def finish_dispatch(self):
+        """
+        Calculate feed-in and power sink after dispatch
+        :return: None
+        """
+        if self.chunk is None:
+            self.collect_results()
+        if len(self.power_sink) == 0:
+            self.power_sink_max = 0
+            self.system_covered = True
+        else:
+            self.power_sink_max = float(self.power_sink.max().iloc[0])
+            self.system_covered = False
+        self.dispatch_finished = True
+
     def check_dispatch(self):
         """
         Check if all load is covered with current system components
-        :return: None
+        :return: pd.DataFrame
+            not covered load (power sink) [W]
         """
-        power_sink = {}  # speichert die nicht gedeckte Leistung
-        for clock in self.df.index:
-            if self.df.at[clock, 'P_Res [W]'] > 0:
-                power_sink[clock] = self.df.at[clock, 'P_Res [W]']
+        power_sink = self.unmet_load()['Power sink [W]']
+        power_sink_df = power_sink.round(2).to_frame()
+        power_sink_df.index.name = 'Time'
 
-        power_sink_df = pd.DataFrame(power_sink.items(),
-                                     columns=['Time', 'P [W]'])
-        print (f"nicht gedeckte Leistung power Sink um {clock} ist {power_sink_df['P [W]']}")
+        return power_sink_df
 
-        power_sink_df = power_sink_df.set_index('Time')
-        power_sink_df = power_sink_df.round(2)
-        print("Nicht gedeckte Leistung", power_sink_df)
+    def unmet_load(self):
+        """
+        Analyze load not covered by the dispatch
+        :return: dict
+            power sink series [W], loss of load [h], energy not supplied [kWh], peak power sink [W],
+            longest outage [h] and duration curve [W] (see dispatch.analyze_unmet_load)
+        """
+        if self._df is None and self.store is not None:
+            # Results of the array dispatch are analyzed in the store, the DataFrame is not built
+            p_res = self.store['P_Res [W]']
+            index = self.store.index
+        else:
+            p_res = self.df['P_Res [W]'].to_numpy(dtype=float)
+            index = self.df.index
 
-        return power_sink_df  # die Werte werden in einer DF gegeben mit nicht gedeckte leistung
+        return analyze_unmet_load(p_res=p_res,
+                                  index=index,
+                                  dt=self.env.i_step / 60)
 
     def stable_grid(self,
                     clock: dt.datetime):
@@ -321,7 +493,7 @@ class Operator:
         """
         env = self.env
         p_res = self.df.at[clock, 'P_Res [W]']
-        t_step = self.env.i_step
+        i = env.time_axis.position(clock)
 
         # Check Energy storage parameters
         storage_power = {}
@@ -338,9 +510,9 @@ class Operator:
         if p_res == 0:
             return
         #if(p_res < power_sum) and (p_res < capacity_sum):
-        if clock != es.df.index[0]:
+        if i != 0:
 
-            if es.df.at[clock - dt.timedelta(minutes=t_step), 'SOC'] > es.soc_min :
+            if es.df.iat[i - 1, es.soc_col] > es.soc_min :
 
                 # Discharge storage
                     for es in env.storage:
@@ -397,14 +569,15 @@ class Operator:
         if self.env.grid_connection is False:
             pass
         else:
-            self.df[f'{component.name} Feed in [W]'] = self.df[f'{component.name} remain [W]']
+            store = self.store
+            store[f'{component.name} Feed in [W]'] = store[f'{component.name} remain [W]']
             if isinstance(component, PV):
-                self.df[f'{component.name} Feed in [{self.env.currency}]'] \
-                    = self.df[
+                store[f'{component.name} Feed in [{self.env.currency}]'] \
+                    = store[
                           f'{component.name} Feed in [W]'] * self.env.i_step / 60 / 1000 * self.env.pv_feed_in_tariff
             elif isinstance(component, WindTurbine):
-                self.df[f'{component.name} Feed in [{self.env.currency}]'] \
-                    = self.df[
+                store[f'{component.name} Feed in [{self.env.currency}]'] \
+                    = store[
                           f'{component.name} Feed in [W]'] * self.env.i_step / 60 / 1000 * self.env.wt_feed_in_tariff
 
     def re_self_supply(self,
@@ -546,7 +719,9 @@ class Operator:
         decimal = self.env.csv_decimal
         root = sys.path[1]
         Path(f'{sys.path[1]}/export').mkdir(parents=True, exist_ok=True)
-        self.df.to_csv(root + '/export/operator.csv', sep=sep, decimal=decimal)
+        if self.chunk is None:
+            # Chunked dispatch exports results during dispatch
+            self.df.to_csv(root + '/export/operator.csv', sep=sep, decimal=decimal)
         self.env.weather_data[0].to_csv(f'{root}/export/weather_data.csv', sep=sep, decimal=decimal)
         self.env.wt_weather_data.to_csv(f'{root}/export/wt_weather_data.csv', sep=sep, decimal=decimal)
         self.env.monthly_weather_data.to_csv(f'{root}/export/monthly_weather_data.csv', sep=sep, decimal=decimal)
@@ -641,7 +816,8 @@ class Operator:
         available_h2 = hstr.hstorage_df.at[clock, 'Storage Level [kg]']
 
         if pd.isna(available_h2):
-            previous_values = hstr.hstorage_df.loc[:clock, 'Storage Level [kg]'].dropna()
+            i = self.env.time_axis.position(clock)
+            previous_values = hstr.hstorage_df['Storage Level [kg]'].iloc[:i + 1].dropna()
             if not previous_values.empty:
                 available_h2 = previous_values.iloc[-1]  # Letzten gültigen Wert nehmen
                 print(
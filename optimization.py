@@ -0,0 +1,224 @@
+import sys
+import itertools
+import numpy as np
+import pandas as pd
+from lcoe.lcoe import lcoe as py_lcoe
+# MiGUEL modules
+from environment import Environment
+from scenario import ScenarioRunner
+
+
+class SizingOptimizer:
+    """
+    Class to optimize component sizes regarding the system LCOE
+    Designs violating the unmet load constraint are penalized
+    Candidate designs are evaluated in parallel by scenario.ScenarioRunner and cached by design vector
+    """
+
+    def __init__(self,
+                 env: Environment,
+                 bounds: dict,
+                 max_unmet_load: float = 0,
+                 penalty: float = 100,
+                 resolution: float = 0.1,
+                 processes: int = None,
+                 c_rate: float = 0.5):
+        """
+        :param env: env.Environment
+            reference environment with load and reference PV systems / wind turbines
+        :param bounds: dict
+            {'pv': (min, max) [kWp], 'wt': (min, max) [kW], 'storage': (min, max) [kWh], 'dg': (min, max) [kW]}
+        :param max_unmet_load: float
+            maximum share of load energy not supplied [-]
+        :param penalty: float
+            LCOE penalty per share of load energy not supplied above max_unmet_load [US$/kWh]
+        :param resolution: float
+            size resolution of cached designs [kW, kWh]
+        :param processes: int
+            number of worker processes (default: number of CPU cores)
+        :param c_rate: float
+            storage power per storage capacity [1/h]
+        """
+        for key in bounds:
+            if key not in ['pv', 'wt', 'storage', 'dg']:
+                sys.exit(f'Unknown design variable {key}. Choose from pv, wt, storage or dg.')
+        self.env = env
+        self.keys = list(bounds)
+        self.bounds = [tuple(bounds[key]) for key in self.keys]
+        self.max_unmet_load = max_unmet_load
+        self.penalty = penalty
+        self.resolution = resolution
+        self.runner = ScenarioRunner(env=env,
+                                     processes=processes,
+                                     c_rate=c_rate)
+        self.load_energy = env.df['P_Res [W]'].sum() * env.i_step / 60 / 1000  # kWh
+        self.cache = {}
+
+    @property
+    def results(self):
+        """
+        All evaluated designs
+        :return: pd.DataFrame
+            cached results sorted by objective
+        """
+        df = pd.DataFrame(list(self.cache.values()))
+        if len(df) == 0:
+            return df
+
+        return df.sort_values('Objective').reset_index(drop=True)
+
+    def key(self, x):
+        """
+        Create cache key of design vector
+        :param x: list
+            design vector
+        :return: tuple
+            design vector rounded to resolution
+        """
+        x = np.clip(x, [b[0] for b in self.bounds], [b[1] for b in self.bounds])
+
+        return tuple(round(float(round(value / self.resolution) * self.resolution), 6) for value in x)
+
+    def evaluate(self, vectors: list):
+        """
+        Evaluate design vectors, uncached designs are run in parallel
+        :param vectors: list
+            list of design vectors
+        :return: list
+            list of result dicts
+        """
+        keys = [self.key(x) for x in vectors]
+        new_keys = list(dict.fromkeys(key for key in keys if key not in self.cache))
+        if len(new_keys) > 0:
+            designs = [dict(zip(self.keys, key)) for key in new_keys]
+            results = self.runner.run(designs=designs)
+            for key, result in zip(new_keys, results.to_dict('records')):
+                self.cache[key] = self.add_objective(result=result)
+
+        return [self.cache[key] for key in keys]
+
+    def add_objective(self, result: dict):
+        """
+        Add unrounded system LCOE, unmet load share and objective to result
+        :param result: dict
+            result of scenario.run_design
+        :return: dict
+            result
+        """
+        result['System LCOE [US$/kWh]'] = py_lcoe(annual_output=result['Annual energy supply [kWh/a]'],
+                                                  annual_operating_cost=result['Annual cost [US$/a]'],
+                                                  capital_cost=result['Investment cost [US$]'],
+                                                  discount_rate=self.env.d_rate,
+                                                  lifetime=self.env.lifetime)
+        if self.load_energy > 0:
+            unmet_load = result['Energy not supplied [kWh]'] / self.load_energy
+        else:
+            unmet_load = 0
+        result['Unmet load [-]'] = unmet_load
+        result['Feasible'] = unmet_load <= self.max_unmet_load
+        result['Objective'] = result['System LCOE [US$/kWh]'] \
+            + self.penalty * max(0.0, unmet_load - self.max_unmet_load)
+
+        return result
+
+    def objectives(self, vectors):
+        """
+        Objective function of design vectors, evaluated as one batch
+        :param vectors: list or np.ndarray
+            design vectors
+        :return: np.ndarray
+            penalized system LCOE
+        """
+        return np.array([result['Objective'] for result in self.evaluate(vectors=list(vectors))])
+
+    def grid_search(self, steps: int = 5):
+        """
+        Evaluate all designs of a regular grid
+        :param steps: int or dict
+            number of grid points per design variable
+        :return: dict
+            best design result
+        """
+        axes = []
+        for key, (lower, upper) in zip(self.keys, self.bounds):
+            n = steps[key] if isinstance(steps, dict) else steps
+            axes.append(np.linspace(lower, upper, n))
+        self.evaluate(vectors=[list(x) for x in itertools.product(*axes)])
+
+        return self.best()
+
+    def nelder_mead(self, x0: list = None, max_iter: int = 200, fatol: float = 1e-4):
+        """
+        Minimize objective with Nelder-Mead simplex within the bounds
+        Reflection, expansion and both contractions of an iteration are evaluated as one parallel batch,
+        the point that the simplex rules accept is taken from the batch
+        Shrink steps evaluate all new simplex points as one batch
+        :param x0: list
+            initial design vector (default: best cached design or center of bounds)
+        :param max_iter: int
+            maximum number of iterations
+        :param fatol: float
+            objective tolerance of the simplex [US$/kWh]
+        :return: dict
+            best design result
+        """
+        lower = np.array([bound[0] for bound in self.bounds], dtype=float)
+        upper = np.array([bound[1] for bound in self.bounds], dtype=float)
+        if x0 is None:
+            if len(self.cache) > 0:
+                x0 = [self.best()[key] for key in self.keys]
+            else:
+                x0 = (lower + upper) / 2
+        x0 = np.clip(np.asarray(x0, dtype=float), lower, upper)
+        simplex = [x0]
+        for i in range(len(x0)):
+            x = x0.copy()
+            step = 0.25 * (upper[i] - lower[i])
+            x[i] = x[i] + step if x[i] + step <= upper[i] else x[i] - step
+            simplex.append(x)
+        simplex = np.array(simplex)
+        values = self.objectives(vectors=simplex)
+        for _ in range(max_iter):
+            order = np.argsort(values, kind='stable')
+            simplex = simplex[order]
+            values = values[order]
+            if np.max(np.abs(simplex[1:] - simplex[0])) <= self.resolution \
+                    and np.max(np.abs(values[1:] - values[0])) <= fatol:
+                break
+            centroid = simplex[:-1].mean(axis=0)
+            # Reflection, expansion, outside and inside contraction
+            candidates = np.clip(centroid + np.array([[1], [2], [0.5], [-0.5]]) * (centroid - simplex[-1]),
+                                 lower, upper)
+            reflection, expansion, outside, inside = self.objectives(vectors=candidates)
+            if reflection < values[0]:
+                accepted = 1 if expansion < reflection else 0
+            elif reflection < values[-2]:
+                accepted = 0
+            elif reflection < values[-1]:
+                accepted = 2 if outside <= reflection else None
+            else:
+                accepted = 3 if inside < values[-1] else None
+            if accepted is not None:
+                simplex[-1] = candidates[accepted]
+                values[-1] = [reflection, expansion, outside, inside][accepted]
+            else:
+                # Shrink simplex towards the best point
+                simplex[1:] = simplex[0] + 0.5 * (simplex[1:] - simplex[0])
+                values[1:] = self.objectives(vectors=simplex[1:])
+
+        return self.best()
+
+    def best(self):
+        """
+        Best design of all evaluated designs, feasible designs are preferred
+        :return: dict
+            best design result
+        """
+        if len(self.cache) == 0:
+            sys.exit('No designs evaluated. Run grid_search or nelder_mead first.')
+        results = list(self.cache.values())
+        feasible = [result for result in results if result['Feasible']]
+        if len(feasible) > 0:
+            results = feasible
+
+        return min(results, key=lambda result: result['Objective'])
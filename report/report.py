@@ -351,11 +351,11 @@ class Report:
         pv_energy = 0
         for i in range(len(self.env.wind_turbine)):
             columns.append(f'{self.env.wind_turbine[i].name}: P [W]')
-            wt_energy += self.env.df['WT_' + str(i + 1) + ': P [W]'].sum()
+            wt_energy += self.env.get_series('WT_' + str(i + 1) + ': P [W]').sum()
         for i in range(len(self.env.pv)):
             columns.append(f'{self.env.pv[i].name}: P [W]')
-            pv_energy += self.env.df['PV_' + str(i + 1) + ': P [W]'].sum()
-        self.create_plot(df=self.env.df,
+            pv_energy += self.env.get_series('PV_' + str(i + 1) + ': P [W]').sum()
+        self.create_plot(df=self.env.view(columns=columns),
                          columns=columns,
                          file_name='re_supply',
                          x_label='Time',
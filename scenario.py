@@ -0,0 +1,160 @@
+import os
+import sys
+import pickle
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+# MiGUEL modules
+from environment import Environment
+from operation import Operator
+from evaluation import Evaluation
+
+# Base environment and normalized profiles of worker processes
+worker_base = None
+worker_profiles = None
+
+
+def init_worker(base: bytes, profiles: dict):
+    """
+    Initialize worker process with pickled base environment and normalized profiles
+    :param base: bytes
+        pickled base environment
+    :param profiles: dict
+        normalized production profiles [W/W]
+    :return: None
+    """
+    global worker_base, worker_profiles
+    worker_base = base
+    worker_profiles = profiles
+
+
+def run_design(design: dict):
+    """
+    Run dispatch and evaluation of a system design in the worker base environment
+    :param design: dict
+        {'pv': float [kWp], 'wt': float [kW], 'storage': float [kWh], 'storage_power': float [kW], 'dg': float [kW]}
+    :return: dict
+        design and system KPIs
+    """
+    env = pickle.loads(worker_base)
+    pv = design.get('pv', 0)
+    wt = design.get('wt', 0)
+    storage = design.get('storage', 0)
+    storage_power = design.get('storage_power', 0)
+    dg = design.get('dg', 0)
+    if pv > 0:
+        env.add_pv(p_n=pv * 1000,
+                   pv_profile=worker_profiles['pv'] * pv * 1000)
+    if wt > 0:
+        env.add_wind_turbine(p_n=wt * 1000,
+                             wt_profile=worker_profiles['wt'] * wt * 1000)
+    if dg > 0:
+        env.add_diesel_generator(p_n=dg * 1000)
+    if storage > 0:
+        env.add_storage(p_n=storage_power * 1000,
+                        c=storage * 1000)
+    operator = Operator(env=env,
+                        engine='array',
+                        export=False)
+    evaluation = Evaluation(env=env,
+                            operator=operator,
+                            export=False)
+    result = dict(design)
+    result.update(evaluation.evaluation_df.loc['System'].to_dict())
+    unmet_load = operator.unmet_load()
+    result['Energy not supplied [kWh]'] = unmet_load['Energy not supplied [kWh]']
+    result['Peak power sink [W]'] = operator.power_sink_max
+    result['Loss of load [h]'] = unmet_load['Loss of load [h]']
+    result['Longest outage [h]'] = unmet_load['Longest outage [h]']
+    result['System covered'] = operator.system_covered
+
+    return result
+
+
+class ScenarioRunner:
+    """
+    Class to run many system designs on the weather data and profiles of one Environment
+    """
+
+    def __init__(self,
+                 env: Environment,
+                 processes: int = None,
+                 c_rate: float = 0.5):
+        """
+        :param env: env.Environment
+            reference environment with load and reference PV systems / wind turbines
+        :param processes: int
+            number of worker processes (default: number of CPU cores, 1 runs designs in this process)
+        :param c_rate: float
+            storage power per storage capacity if a design has no storage_power [1/h]
+        """
+        self.env = env
+        if processes is None:
+            processes = os.cpu_count()
+        self.processes = processes
+        self.c_rate = c_rate
+        # Load weather data once, workers receive it with the pickled base environment
+        self.env.build()
+        self.profiles = self.create_profiles()
+        self.base = pickle.dumps(self.env.copy_base())
+        self.results = None
+
+    def create_profiles(self):
+        """
+        Create production profiles normalized to nominal power from the reference components
+        :return: dict
+            {'pv': np.ndarray or None, 'wt': np.ndarray or None} [W/W]
+        """
+        profiles = {}
+        for key, components in [('pv', self.env.pv), ('wt', self.env.wind_turbine)]:
+            components = [component for component in components if component.p_n]
+            if len(components) == 0:
+                profiles[key] = None
+                continue
+            power = sum(component.df['P [W]'].to_numpy(dtype=float) for component in components)
+            p_n = sum(component.p_n for component in components)
+            profiles[key] = power / p_n
+
+        return profiles
+
+    def prepare_designs(self, designs: list):
+        """
+        Complete designs with storage power and check available profiles
+        :param designs: list
+            list of design dicts
+        :return: list
+            prepared designs
+        """
+        prepared = []
+        for design in designs:
+            design = dict(design)
+            if design.get('storage', 0) > 0 and design.get('storage_power') is None:
+                design['storage_power'] = design['storage'] * self.c_rate
+            for key in ['pv', 'wt']:
+                if design.get(key, 0) > 0 and self.profiles[key] is None:
+                    sys.exit(f'No reference {key} component in environment to scale design {design}.')
+            prepared.append(design)
+
+        return prepared
+
+    def run(self, designs: list):
+        """
+        Run all designs and collect the system KPIs
+        :param designs: list
+            list of design dicts
+            {'pv': float [kWp], 'wt': float [kW], 'storage': float [kWh], 'storage_power': float [kW], 'dg': float [kW]}
+        :return: pd.DataFrame
+            result table with one row per design
+        """
+        designs = self.prepare_designs(designs=designs)
+        if self.processes == 1 or len(designs) == 1:
+            init_worker(base=self.base,
+                        profiles=self.profiles)
+            results = [run_design(design) for design in designs]
+        else:
+            with ProcessPoolExecutor(max_workers=self.processes,
+                                     initializer=init_worker,
+                                     initargs=(self.base, self.profiles)) as executor:
+                results = list(executor.map(run_design, designs))
+        self.results = pd.DataFrame(results)
+
+        return self.results
@@ -0,0 +1,161 @@
+import os
+import sys
+import shutil
+import sqlite3
+import pickle
+import datetime as dt
+import numpy as np
+import pandas as pd
+import pytest
+
+# MiGUEL modules are imported from the repository root, sys.path[1] is the root for data paths
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if root not in sys.path:
+    sys.path.insert(0, root)
+# Plots of the loop dispatch are not shown
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+location = {'latitude': 52.52, 'longitude': 13.405,
+            'terrain': 'Agricultural terrain with some houses and 8 meter high hedges at a distance of approx. '
+                       '1250 meters'}
+address = {'city': 'Berlin', 'postcode': '10117', 'state': 'Berlin', 'country': 'Germany', 'country_code': 'de'}
+
+
+class Resolver:
+    """
+    Offline location resolver counting requests
+    """
+
+    def __init__(self, location: dict = None, elevation: float = 35.0):
+        self.location = location
+        self.height = elevation
+        self.requests = []
+
+    def address(self, latitude, longitude):
+        self.requests.append('address')
+        return self.location
+
+    def elevation(self, latitude, longitude):
+        self.requests.append('elevation')
+        return self.height
+
+
+def create_weather_data():
+    """
+    Hourly PVGIS TMY stand-in with clear sky irradiance and periodic wind speed
+    """
+    index = pd.date_range('2023-01-01', '2023-12-31 23:00', freq='h', tz='UTC')
+    clearsky = pvlib_location().get_clearsky(index)
+    hours = np.arange(len(index))
+    data = pd.DataFrame({'temp_air': 10 + 8 * np.sin(hours / 24 * 2 * np.pi),
+                         'relative_humidity': 70.0,
+                         'ghi': clearsky['ghi'].to_numpy(),
+                         'dni': clearsky['dni'].to_numpy(),
+                         'dhi': clearsky['dhi'].to_numpy(),
+                         'IR(h)': 300.0,
+                         'wind_speed': 5 + 3 * np.sin(hours / 30),
+                         'wind_direction': 180.0,
+                         'pressure': 101325.0},
+                        index=index.tz_localize(None))
+
+    return data, None, None, None
+
+
+def pvlib_location():
+    import pvlib
+    return pvlib.location.Location(latitude=location['latitude'],
+                                   longitude=location['longitude'])
+
+
+@pytest.fixture(scope='session')
+def database_file(tmp_path_factory):
+    """
+    MiGUEL database with subsets of the pvlib CEC tables, the windpowerlib turbine table
+    and fuel consumption curves of diesel generators
+    """
+    import pvlib
+    import windpowerlib
+    path = tmp_path_factory.mktemp('database') / 'miguel.db'
+    connect = sqlite3.connect(path)
+    modules = pvlib.pvsystem.retrieve_sam('CECMod').iloc[:, ::100].T.infer_objects()
+    modules.to_sql('pvlib_cec_module', connect)
+    inverters = pvlib.pvsystem.retrieve_sam('cecinverter').iloc[:, ::10].T.infer_objects()
+    inverters.to_sql('pvlib_cec_inverter', connect)
+    turbines = pd.read_csv(os.path.join(os.path.dirname(windpowerlib.__file__), 'oedb', 'turbine_data.csv'))
+    turbines.to_sql('windpowerlib_turbine', connect)
+    # Fuel consumption [l/h] = x2 * p^2 + x1 * p + x0 of relative power p
+    fuel_consumption = pd.DataFrame({'Power': [20, 100, 500, 2250],
+                                     'x2': [0.5, 2.0, 10.0, 40.0],
+                                     'x1': [4.0, 20.0, 100.0, 450.0],
+                                     'x0': [1.0, 5.0, 25.0, 110.0]})
+    fuel_consumption.to_sql('dg_fuel_consumption_data', connect, index=False)
+    connect.close()
+
+    return path
+
+
+@pytest.fixture
+def data_root(tmp_path, monkeypatch, database_file):
+    """
+    Temporary data root sys.path[1] with database, weather cache and export directory,
+    process-wide caches of catalogs and simulations start empty
+    """
+    (tmp_path / 'data').mkdir()
+    shutil.copy(database_file, tmp_path / 'data' / 'miguel.db')
+    monkeypatch.setattr(sys, 'path', [sys.path[0], str(tmp_path), *sys.path[1:]])
+    import data.catalog
+    import components.pv
+    import components.windturbine
+    monkeypatch.setattr(data.catalog, 'catalogs', {})
+    for name in ['modelchain_cache', 'normalized_cache']:
+        monkeypatch.setattr(components.pv, name, {})
+    for name in ['hub_wind_speed_cache', 'power_curve_cache', 'power_output_cache']:
+        monkeypatch.setattr(components.windturbine, name, {})
+
+    return tmp_path
+
+
+@pytest.fixture
+def weather_data():
+    return create_weather_data()
+
+
+@pytest.fixture
+def resolver():
+    return Resolver(location=address)
+
+
+@pytest.fixture
+def create_environment(data_root, resolver):
+    """
+    Factory of offline environments of the year 2023 with cached weather data
+    """
+    from environment import Environment
+
+    def create(step: int = 60, load: bool = True, cache_weather: bool = True, **parameters):
+        end = dt.datetime(2023, 12, 31, 23, 60 - step) if step < 60 else dt.datetime(2023, 12, 31, 23)
+        parameters = {'name': 'Test',
+                      'time': {'start': dt.datetime(2023, 1, 1), 'end': end,
+                               'step': dt.timedelta(minutes=step), 'timezone': 'Europe/Berlin'},
+                      'location': dict(location),
+                      'grid_connection': True,
+                      'offline': True,
+                      'location_resolver': resolver,
+                      **parameters}
+        env = Environment(**parameters)
+        path = env.weather_cache_path(startyear=2005,
+                                      usehorizon=True)
+        if cache_weather and not os.path.isfile(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as file:
+                pickle.dump(create_weather_data(), file)
+        if load:
+            hours = np.arange(len(env.time_series)) * env.i_step / 60
+            profile = pd.DataFrame({'P [W]': 3000 + 1500 * np.sin(hours / 24 * 2 * np.pi)},
+                                   index=pd.Index(env.time_series, name='Time'))
+            profile.to_csv(data_root / 'load.csv')
+            env.add_load(load_profile=str(data_root / 'load.csv'))
+
+        return env
+
+    return create
@@ -0,0 +1,83 @@
+import sqlite3
+import types
+import numpy as np
+import pandas as pd
+import pytest
+
+import data.catalog
+from data.catalog import Catalog, TurbineCatalog, get_catalog
+from data.data import DB
+
+
+def create_database(tables: dict):
+    """
+    In-memory database with the attributes of data.DB
+    """
+    connect = sqlite3.connect(':memory:')
+    for table, df in tables.items():
+        df.to_sql(table, connect)
+
+    return types.SimpleNamespace(connect=connect, cursor=connect.cursor())
+
+
+def test_select_matches_linear_filter():
+    rng = np.random.default_rng(0)
+    paco = rng.integers(100, 5000, size=300).astype(float)
+    df = pd.DataFrame({'Paco': paco}, index=pd.Index([f'Inverter_{i}' for i in range(300)], name='index'))
+    catalog = Catalog(database=create_database({'inverter': df}),
+                      table='inverter',
+                      rating=lambda df: df['Paco'].astype(float))
+    for lower, upper in [(0, 10000), (1000, 2000), (paco[3], paco[7]), (2500, 2500), (5000, 100)]:
+        expected = [name for name, power in zip(df.index, paco) if lower < power < upper]
+        assert catalog.select(lower=lower, upper=upper) == expected
+    assert catalog['Inverter_5']['Paco'] == paco[5]
+    assert 'Inverter_5' in catalog and 'Inverter_300' not in catalog
+
+
+def test_pvlib_catalogs_are_loaded_once(data_root):
+    database = DB()
+    modules = get_catalog(database=database, table='pvlib_cec_module')
+    inverters = get_catalog(database=database, table='pvlib_cec_inverter')
+
+    assert get_catalog(database=DB(), table='pvlib_cec_module') is modules
+    assert set(data.catalog.catalogs) == {'pvlib_cec_module', 'pvlib_cec_inverter'}
+    assert len(modules.select(lower=200, upper=400)) > 0
+    for name in modules.select(lower=200, upper=400):
+        module = modules[name]
+        assert 200 < module['I_mp_ref'] * module['V_mp_ref'] < 400
+    assert all(1000 < inverters[name]['Paco'] < 3000 for name in inverters.select(lower=1000, upper=3000))
+
+
+def test_turbine_catalog_hub_heights_and_valid_turbines():
+    df = pd.DataFrame({'turbine_type': ['T1', 'T2', 'T3', 'T4'],
+                       'nominal_power': [2000000, 3000000, 800000, 1500000],
+                       'has_power_curve': [1, 1, 0, 1],
+                       'hub_height': ['92;108,5;None', None, '60', 'None']})
+    catalog = TurbineCatalog(database=create_database({'windpowerlib_turbine': df}))
+    assert catalog.hub_heights == [[92.0, 108.5], [], [60.0], []]
+    np.testing.assert_array_equal(catalog.valid, [True, False, False, False])
+    assert catalog.select(lower=1000000, upper=4000000) == ['T1', 'T2', 'T4']
+    turbine = catalog.sample(power_min=0, power_max=4000000, rng=np.random.default_rng(0))
+    assert turbine['turbine_type'] == 'T1'
+    assert turbine['hub_height'] in [92.0, 108.5]
+    with pytest.raises(SystemExit):
+        catalog.sample(power_min=0, power_max=1000000, rng=np.random.default_rng(0))
+
+
+@pytest.mark.parametrize('value, hub_heights', [('92;108,5;None', [92.0, 108.5]),
+                                                ('75/85', [75.0, 85.0]),
+                                                ('68-90', [68.0, 90.0]),
+                                                ('100; side spec', [100.0]),
+                                                (float('nan'), [])])
+def test_parse_hub_heights(value, hub_heights):
+    assert TurbineCatalog.parse_hub_heights(value) == hub_heights
+
+
+def test_turbine_catalog_of_windpowerlib_table(data_root):
+    catalog = get_catalog(database=DB(), table='windpowerlib_turbine')
+    turbine = catalog.sample(power_min=1000000, power_max=3000000, rng=np.random.default_rng(1))
+
+    assert 1000000 < turbine['p_n'] < 3000000
+    assert catalog.df.loc[turbine['turbine_type'], 'has_power_curve']
+    assert turbine['hub_height'] in catalog.hub_heights[catalog.names.index(turbine['turbine_type'])]
+    assert turbine == catalog.sample(power_min=1000000, power_max=3000000, rng=np.random.default_rng(1))
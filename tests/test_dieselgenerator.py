@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def test_run_array_limits_power_and_calculates_fuel(create_environment):
+    env = create_environment()
+    env.diesel_price = 2
+    env.add_diesel_generator(p_n=5000)
+    dg = env.diesel_generator[0]
+    demand = np.array([0, 500, 1500, 4000, 7000])
+    power = dg.run_array(power=demand, start=10)
+
+    # Power is limited to p_n, conventional generators run at least at 30 % of p_n
+    np.testing.assert_allclose(power, [0, 1500, 1500, 4000, 5000])
+    fuel_consumption = dg.df['Fuel consumption [l/h]'].to_numpy()[10:15]
+    np.testing.assert_allclose(fuel_consumption[0], 0)
+    np.testing.assert_allclose(fuel_consumption[1:], dg.power_curve(power[1:] / 5000))
+    np.testing.assert_allclose(dg.df['Fuel cost [US$]'].to_numpy()[10:15], fuel_consumption * 2)
+    np.testing.assert_allclose(dg.df['P [%]'].to_numpy()[10:15], power / 5000)
+    assert dg.df['P [W]'].iloc[:10].isna().all()
+
+
+def test_run_of_time_step_matches_run_array(create_environment):
+    env = create_environment()
+    env.add_diesel_generator(p_n=5000)
+    env.add_diesel_generator(p_n=5000, model=True)
+    dg, low_load = env.diesel_generator
+    assert dg.df['P [W]'].isna().all()
+    power = dg.run(clock=env.time_series[20], power=1000)
+    dg.run_array(power=np.array([1000]), start=21)
+
+    assert power == 1500
+    # The cached DataFrame is rebuilt after a run
+    np.testing.assert_array_equal(dg.df['P [W]'].to_numpy()[20:22], [1500, 1500])
+    np.testing.assert_array_equal(dg.df['Fuel consumption [l/h]'].to_numpy()[20],
+                                  dg.df['Fuel consumption [l/h]'].to_numpy()[21])
+    # Low load generators run below 30 % of p_n
+    assert low_load.run(clock=env.time_series[20], power=1000) == 1000
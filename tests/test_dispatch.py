@@ -0,0 +1,179 @@
+import sys
+import types
+import numpy as np
+import pandas as pd
+import pytest
+
+from dispatch import ArrayDispatch, ResultStore, analyze_unmet_load
+from components.storage import Storage
+
+
+class TimeAxis:
+    def __init__(self, index):
+        self.index = index
+
+    def position(self, clock):
+        return self.index.get_loc(clock)
+
+
+def create_env(n: int = 96 * 7, grid: bool = True, precision: str = 'double', seed: int = 0):
+    """
+    Environment with load, one PV system, one storage and optional grid connection
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2022-01-01', periods=n, freq='15min')
+    load = 20000 + 5000 * rng.random(n)
+    production = np.clip(40000 * np.sin(np.arange(n) / 96 * 2 * np.pi - np.pi / 2), 0, None)
+    dtype = np.float32 if precision == 'single' else np.float64
+    env = types.SimpleNamespace(i_step=15, t_step=pd.Timedelta(minutes=15), grid_connection=grid, blackout=False,
+                                feed_in=False, currency='US$', diesel_price=1.0, precision=precision, dtype=dtype,
+                                lifetime=20, d_rate=0.03, csv_sep=',', csv_decimal='.',
+                                electrolyser=[], H2Storage=[], fuel_cell=[], diesel_generator=[], wind_turbine=[])
+    env.time = pd.Series(index)
+    env.time_series = index
+    env.time_axis = TimeAxis(index)
+    env.df = pd.DataFrame({'P_Res [W]': load.astype(dtype)}, index=index)
+    pv = types.SimpleNamespace(name='PV_1', df=pd.DataFrame({'P [W]': production.astype(dtype)}, index=index))
+    env.re_supply = [pv]
+    env.pv = [pv]
+    env.get_series = lambda col: pv.df['P [W]'] if col == 'PV total power [W]' else env.df[col]
+    env.calc_energy_consumption_parameters = lambda: (load.sum() * 0.25 / 1000, load.max())
+    env.storage = [Storage(env=env, name='ES_1', p_n=10000, c=30000, soc=0.25)]
+    env.grid = types.SimpleNamespace(name='Grid_1') if grid else None
+
+    return env
+
+
+def run_operator(env, **kwargs):
+    operation = pytest.importorskip('operation')
+    return operation.Operator(env=env, export=False, **kwargs)
+
+
+def test_array_engine_matches_loop_engine(capsys):
+    loop = run_operator(create_env(), engine='loop').df
+    array = run_operator(create_env(), engine='array').df
+    assert list(array.columns) == list(loop.columns)
+    for col in loop.columns:
+        np.testing.assert_allclose(array[col].to_numpy(dtype=float),
+                                   loop[col].to_numpy(dtype=float),
+                                   atol=1e-6,
+                                   err_msg=col)
+
+
+def test_analyze_unmet_load_matches_step_loop():
+    rng = np.random.default_rng(1)
+    index = pd.date_range('2022-01-01', periods=500, freq='15min')
+    p_res = np.where(rng.random(500) < 0.3, 1000 * rng.random(500), 0)
+    dt = 0.25
+    result = analyze_unmet_load(p_res=p_res, index=index, dt=dt)
+    sink, run, longest = [], 0, 0
+    for clock, value in zip(index, p_res):
+        if value > 0:
+            sink.append((clock, value))
+            run += 1
+            longest = max(longest, run)
+        else:
+            run = 0
+    values = np.array([value for clock, value in sink])
+    assert list(result['Power sink [W]'].index) == [clock for clock, value in sink]
+    np.testing.assert_allclose(result['Power sink [W]'].to_numpy(), values)
+    assert result['Loss of load [h]'] == pytest.approx(len(sink) * dt)
+    assert result['Energy not supplied [kWh]'] == pytest.approx(values.sum() * dt / 1000)
+    assert result['Peak power sink [W]'] == pytest.approx(values.max())
+    assert result['Longest outage [h]'] == pytest.approx(longest * dt)
+    np.testing.assert_allclose(result['Duration curve [W]'], sorted(values, reverse=True))
+
+
+def test_analyze_unmet_load_without_outage():
+    index = pd.date_range('2022-01-01', periods=4, freq='h')
+    result = analyze_unmet_load(p_res=np.zeros(4), index=index, dt=1)
+    assert len(result['Power sink [W]']) == 0
+    assert result['Longest outage [h]'] == 0
+    assert result['Peak power sink [W]'] == 0
+
+
+def test_array_dispatch_analyzes_unmet_load_without_frame(capsys):
+    operator = run_operator(create_env(grid=False), engine='array')
+    assert operator._df is None
+    assert not operator.system_covered
+    p_res = operator.df['P_Res [W]']
+    expected = p_res[p_res > 0].round(2)
+    np.testing.assert_allclose(operator.power_sink['P [W]'].to_numpy(dtype=float), expected.to_numpy())
+    assert list(operator.power_sink.index) == list(expected.index)
+    assert operator.power_sink_max == pytest.approx(expected.max())
+
+
+def test_result_store_columns_and_references():
+    index = pd.date_range('2022-01-01', periods=10, freq='h')
+    production = np.arange(10, dtype=np.float32)
+    store = ResultStore(index=index,
+                        columns={'A [W]': 0, 'B [W]': np.nan, 'C [W]': np.arange(10), 'PV [W]': production},
+                        dtype=np.float32,
+                        references=['PV [W]'])
+    assert store.values.dtype == np.float32
+    assert store.values.shape == (10, 3)
+    assert store['PV [W]'] is production
+    np.testing.assert_array_equal(store['C [W]'], np.arange(10))
+    assert np.isnan(store['B [W]']).all()
+    store['A [W]'] = np.ones(10)
+    df = store.to_frame()
+    assert list(df.columns) == ['A [W]', 'B [W]', 'C [W]', 'PV [W]']
+    np.testing.assert_array_equal(df['A [W]'].to_numpy(), np.ones(10))
+    np.testing.assert_array_equal(df['PV [W]'].to_numpy(), production)
+    with pytest.raises(KeyError):
+        store['D [W]'] = np.ones(10)
+
+
+def test_result_store_frame_shares_memory():
+    index = pd.date_range('2022-01-01', periods=10, freq='h')
+    store = ResultStore(index=index, columns={'A [W]': 0, 'B [W]': 1})
+    df = store.to_frame()
+    assert np.shares_memory(df.to_numpy(), store.values)
+
+
+def test_re_self_supply_covers_load_in_component_order():
+    env = create_env(n=96)
+    pv = env.re_supply[0]
+    env.re_supply.append(types.SimpleNamespace(name='PV_2', df=pv.df * 0.5))
+    operator = types.SimpleNamespace(env=env,
+                                     store=ResultStore(index=env.time_series,
+                                                       columns={'P_Res [W]': env.df['P_Res [W]']}))
+    supply, remain, p_res, surplus = ArrayDispatch(operator=operator).re_self_supply()
+    # Reference: components cover the residual load one after another
+    reference_p_res = env.df['P_Res [W]'].to_numpy(dtype=float)
+    reference_surplus = np.zeros(96)
+    for k, component in enumerate(env.re_supply):
+        production = component.df['P [W]'].to_numpy(dtype=float)
+        reference_supply = np.minimum(reference_p_res, production)
+        np.testing.assert_allclose(supply[k], reference_supply)
+        np.testing.assert_allclose(remain[k], production - reference_supply)
+        reference_surplus += production - reference_supply
+        reference_p_res = reference_p_res - reference_supply
+    np.testing.assert_allclose(p_res, reference_p_res)
+    np.testing.assert_allclose(surplus, reference_surplus)
+
+
+def test_chunked_dispatch_matches_array_dispatch(monkeypatch, tmp_path, capsys):
+    array = run_operator(create_env(), engine='array')
+    # Chunks are exported to export/operator.csv below the data root sys.path[1]
+    monkeypatch.setattr(sys, 'path', [sys.path[0], str(tmp_path), *sys.path[1:]])
+    stream = run_operator(create_env(), engine='array', chunk='D')
+    assert stream.store is None
+    assert list(stream.df.columns) == list(array.df.columns)
+    for col in array.df.columns:
+        np.testing.assert_allclose(stream.df[col].to_numpy(dtype=float),
+                                   array.df[col].to_numpy(dtype=float),
+                                   atol=1e-6,
+                                   err_msg=col)
+        assert stream.column_sum(col) == pytest.approx(array.column_sum(col), abs=1e-6)
+    assert stream.power_sink_max == pytest.approx(array.power_sink_max)
+
+
+def test_single_precision_matches_double_precision(capsys):
+    env = create_env(precision='single')
+    single = run_operator(env, engine='array')
+    double = run_operator(create_env(), engine='array')
+    assert single.store.values.dtype == np.float32
+    assert np.shares_memory(single.store['PV_1 production [W]'], env.pv[0].df['P [W]'].to_numpy())
+    for col in double.df.columns:
+        assert single.column_sum(col) == pytest.approx(double.column_sum(col), rel=1e-4, abs=1e-2), col
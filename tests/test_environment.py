@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from environment import TimeAxis
+
+
+def test_time_axis_position_matches_index_lookup():
+    index = pd.date_range('2022-01-01', '2022-12-31 23:45', freq='15min')
+    time_axis = TimeAxis(index=index)
+    for clock in index[np.random.default_rng(0).integers(len(index), size=200)]:
+        assert time_axis.position(clock) == index.get_loc(clock)
+    assert time_axis.position(index[0].to_pydatetime()) == 0
+    assert time_axis.position(index[-1]) == len(index) - 1
+
+
+def test_time_axis_of_irregular_index():
+    index = pd.DatetimeIndex(['2022-01-01 00:00', '2022-01-01 00:15', '2022-01-01 01:00'])
+    time_axis = TimeAxis(index=index)
+    assert time_axis.step is None
+    assert [time_axis.position(clock) for clock in index] == [0, 1, 2]
+
+
+def test_weather_data_cached_after_download(create_environment, weather_data, monkeypatch):
+    import pvlib
+    requests = []
+
+    def get_pvgis_tmy(**parameters):
+        requests.append(parameters)
+        return weather_data
+
+    monkeypatch.setattr(pvlib.iotools, 'get_pvgis_tmy', get_pvgis_tmy)
+    env = create_environment(load=False, cache_weather=False, offline=False)
+    downloaded = env.weather_data[0].copy()
+    assert len(requests) == 1
+    cached = create_environment(load=False, cache_weather=False, offline=False).weather_data[0]
+    assert len(requests) == 1
+    pd.testing.assert_frame_equal(cached, downloaded)
+    create_environment(load=False, cache_weather=False, offline=False, weather_cache=False).weather_data
+    assert len(requests) == 2
+
+
+def test_offline_environment_without_cached_weather_data(create_environment):
+    env = create_environment(load=False, cache_weather=False)
+    with pytest.raises(SystemExit, match='No cached weather data'):
+        env.weather_data
+
+
+def test_profiles_added_without_build(create_environment, resolver, data_root):
+    env = create_environment()
+    hours = np.arange(len(env.time_series))
+    env.add_pv(p_n=5000, pv_profile=np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None) * 5000)
+    env.add_wind_turbine(p_n=3000, wt_profile=np.full(len(hours), 1500.0))
+    # Location, weather data and database are not loaded for supplied profiles
+    assert resolver.requests == []
+    assert env._weather_data is None and env._database is None
+    assert env.get_series('PV total power [W]').max() == pytest.approx(5000)
+    assert env.build() is env
+    assert sorted(resolver.requests) == ['address', 'elevation']
+    assert env.address[0] == 'Berlin' and env.altitude == 35.0
+    assert env._wt_weather_data is not None and env._monthly_weather_data is not None
+    assert (data_root / 'export' / 'config' / 'system_config.ini').is_file()
+
+
+def test_resample_interpolates_hourly_data(create_environment, weather_data):
+    env = create_environment(step=15, load=False)
+    data = weather_data[0][['temp_air', 'wind_speed']]
+    data.index = pd.date_range('2023-01-01', periods=len(data), freq='h')
+    resampled = env.resample(data=data)
+    assert resampled.index.equals(env.time_series)
+    # Linear interpolation between hours, the last hour is held
+    hours = np.arange(len(env.time_series)) / 4
+    for col in data.columns:
+        expected = np.interp(hours, np.arange(len(data)), data[col].to_numpy())
+        np.testing.assert_allclose(resampled[col].to_numpy(), expected)
+    series = env.resample(data=data['wind_speed'], index=env.time_series[:8])
+    np.testing.assert_allclose(series.to_numpy(), np.interp(hours[:8], np.arange(len(data)), data['wind_speed']))
+    assert env.wt_weather_data.index.equals(env.time_series)
+    np.testing.assert_allclose(env.wt_weather_data['wind_speed'].to_numpy()[::4], data['wind_speed'].to_numpy())
+    assert create_environment(load=False).resample(data=data) is data
+
+
+def test_component_series_are_resolved_on_access(create_environment):
+    env = create_environment()
+    hours = np.arange(len(env.time))
+    profile = np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None) * 1000
+    env.add_pv(p_n=1000, pv_profile=profile)
+    env.add_pv(p_n=2000, pv_profile=profile * 2)
+    pv_1, pv_2 = env.pv
+
+    assert 'PV_1: P [W]' in env.series and 'PV_1: P [W]' not in env.df.columns
+    assert np.shares_memory(env.get_series('PV_1: P [W]').to_numpy(), pv_1.df['P [W]'].to_numpy())
+    np.testing.assert_allclose(env.get_series('PV total power [W]'), profile * 3)
+    # Component results written after registration are visible in the environment
+    pv_2.df['P [W]'] = 0.0
+    view = env.view(columns=['P_Res [W]', 'PV_2: P [W]', 'PV total power [W]'])
+    assert list(view.columns) == ['P_Res [W]', 'PV_2: P [W]', 'PV total power [W]']
+    np.testing.assert_allclose(view['PV total power [W]'], profile)
+    assert (view['PV_2: P [W]'] == 0).all()
+    env.remove_series(component=pv_2)
+    assert 'PV_2: P [W]' not in env.series and 'PV_1: P [W]' in env.series
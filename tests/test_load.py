@@ -0,0 +1,60 @@
+import types
+import numpy as np
+import pandas as pd
+import pytest
+
+from components.load import Load, convert_resolution, time_steps, bdew_profile_cache
+
+
+def create_env(i_step: int):
+    """
+    Environment with the attributes used by Load for BDEW profiles
+    """
+    time_series = pd.date_range('2022-01-01', '2022-12-31 23:59', freq=f'{i_step}min')
+    return types.SimpleNamespace(time=pd.Series(time_series),
+                                 time_series=time_series,
+                                 t_step=pd.Timedelta(minutes=i_step),
+                                 i_step=i_step,
+                                 hemisphere='north',
+                                 seasons={'winter': [12, 1, 2],
+                                          'transition': [3, 4, 5, 9, 10, 11],
+                                          'summer': [6, 7, 8]},
+                                 dtype=np.float64)
+
+
+@pytest.mark.parametrize('new_step', time_steps)
+def test_convert_resolution_of_quarter_hour_day(new_step):
+    values = np.random.default_rng(0).random((2, 96))
+    converted = convert_resolution(values=values, step=15, new_step=new_step)
+    assert converted.shape == (2, 1440 // new_step)
+    if new_step >= 15:
+        # Block means keep the daily energy
+        np.testing.assert_allclose(converted.mean(axis=-1), values.mean(axis=-1))
+    else:
+        # Linear interpolation on the minute axis, last value is held
+        minutes = np.arange(1440 // new_step) * new_step
+        reference = [np.interp(minutes, np.arange(96) * 15, row) for row in values]
+        np.testing.assert_allclose(converted, reference)
+
+
+@pytest.mark.parametrize('step, new_step, n', [(10, 15, 144), (10, 15, 145), (5, 15, 288), (15, 60, 98), (10, 60, 144)])
+def test_convert_resolution_averages_minutes_of_new_time_step(step, new_step, n):
+    values = np.random.default_rng(1).random((2, n))
+    converted = convert_resolution(values=values, step=step, new_step=new_step)
+    # Values are constant over their time step, new values are the mean of the covered minutes
+    minutes = np.repeat(values, step, axis=-1)
+    n_new = n * step // new_step
+    reference = minutes[:, :n_new * new_step].reshape(2, n_new, new_step).mean(axis=-1)
+    np.testing.assert_allclose(converted, reference)
+
+
+@pytest.mark.parametrize('i_step', time_steps)
+def test_bdew_profile_scaled_to_annual_consumption(i_step):
+    bdew_profile_cache['test'] = np.random.default_rng(1).random((3, 3, 96)) + 0.5
+    load = Load.__new__(Load)
+    load.env = create_env(i_step=i_step)
+    load.annual_consumption = 5e6
+    df = load.bdew_reference_load_profile(profile='test')
+    assert len(df) == len(load.env.time_series)
+    assert not df['P [W]'].isna().any()
+    assert df['P [W]'].sum() * i_step / 60 == pytest.approx(5e6)
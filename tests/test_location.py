@@ -0,0 +1,51 @@
+import sqlite3
+import types
+import pytest
+
+from data.location import LocationCache, LocationResolver
+
+
+def create_database():
+    connect = sqlite3.connect(':memory:')
+    return types.SimpleNamespace(connect=connect, cursor=connect.cursor())
+
+
+def test_lookup_resolves_once_per_rounded_location(resolver):
+    resolver.location = {**resolver.location, 'road': 'Unter den Linden'}
+    cache = LocationCache(database=create_database(), resolver=resolver)
+    location = cache.lookup(52.51631, 13.37770)
+    assert location == {'found': True, 'address': resolver.location, 'elevation': 35.0}
+    assert sorted(resolver.requests) == ['address', 'elevation']
+    # Nearby coordinates share the cached entry, only the cached address columns are kept
+    cached = cache.lookup(52.51634, 13.37771, offline=True)
+    assert cached['found'] is True
+    assert cached['elevation'] == 35.0
+    assert cached['address'] == {col: resolver.location[col] for col in LocationCache.columns}
+    assert len(resolver.requests) == 2
+
+
+def test_lookup_caches_locations_not_on_land(resolver):
+    resolver.location = None
+    cache = LocationCache(database=create_database(), resolver=resolver)
+    assert cache.lookup(40.0, -30.0, elevation=False) == {'found': False, 'address': {}, 'elevation': None}
+    assert resolver.requests == ['address']
+    # Elevation is resolved later if required
+    assert cache.lookup(40.0, -30.0)['elevation'] == 35.0
+    assert resolver.requests == ['address', 'elevation']
+
+
+def test_offline_lookup_exits_without_requests(resolver):
+    cache = LocationCache(database=create_database(), resolver=resolver)
+    with pytest.raises(SystemExit, match='No cached location data'):
+        cache.lookup(52.5, 13.4, offline=True)
+    assert resolver.requests == []
+
+
+def test_offline_environment_does_not_resolve_online(create_environment, monkeypatch):
+    def retry(self, func, *args):
+        raise AssertionError('online request')
+
+    monkeypatch.setattr(LocationResolver, 'retry', retry)
+    env = create_environment(load=False, location_resolver=None)
+    with pytest.raises(SystemExit, match='No cached location data'):
+        env.address
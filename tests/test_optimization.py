@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from optimization import SizingOptimizer
+
+
+class Runner:
+    """
+    Scenario runner with investment cost of a quadratic bowl around pv = 7 kWp and storage = 13 kWh
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def run(self, designs: list):
+        self.batches.append(len(designs))
+        return pd.DataFrame([{**design,
+                              'Annual energy supply [kWh/a]': 1000,
+                              'Annual cost [US$/a]': 0,
+                              'Investment cost [US$]': 100 + (design['pv'] - 7) ** 2 + (design['storage'] - 13) ** 2,
+                              'Energy not supplied [kWh]': 0}
+                             for design in designs])
+
+
+def create_optimizer(env, **parameters):
+    hours = np.arange(len(env.time_series)) * env.i_step / 60
+    env.add_pv(p_n=1000, pv_profile=np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None) * 1000)
+
+    return SizingOptimizer(env=env, processes=1, **parameters)
+
+
+def test_nelder_mead_evaluates_candidates_in_batches(create_environment):
+    optimizer = create_optimizer(create_environment(load=False), bounds={'pv': (0, 20), 'storage': (0, 40)})
+    optimizer.runner = Runner()
+    best = optimizer.nelder_mead(x0=[2, 30])
+    assert best['pv'] == pytest.approx(7, abs=0.2)
+    assert best['storage'] == pytest.approx(13, abs=0.2)
+    # Initial simplex and the candidates of each iteration are evaluated together
+    assert optimizer.runner.batches[0] == 3
+    assert max(optimizer.runner.batches[1:]) == 4
+    assert len(optimizer.runner.batches) < len(optimizer.cache)
+
+
+def test_grid_search_with_scenario_runner(create_environment, capsys):
+    optimizer = create_optimizer(create_environment(grid_connection=False),
+                                 bounds={'pv': (5, 10), 'dg': (2, 8)},
+                                 max_unmet_load=0.01)
+    best = optimizer.grid_search(steps=2)
+    results = optimizer.results
+    assert len(results) == 4
+    assert list(results['Objective']) == sorted(results['Objective'])
+    for result in results.to_dict('records'):
+        unmet_load = result['Energy not supplied [kWh]'] / optimizer.load_energy
+        assert result['Unmet load [-]'] == pytest.approx(unmet_load)
+        assert result['Feasible'] == (unmet_load <= 0.01)
+        assert result['Objective'] == pytest.approx(result['System LCOE [US$/kWh]']
+                                                    + 100 * max(0.0, unmet_load - 0.01))
+    feasible = results[results['Feasible']]
+    assert best['Objective'] == feasible['Objective'].min()
+    assert not results.loc[results['dg'] == 2, 'Feasible'].any()
@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pvlib = pytest.importorskip('pvlib')
+import components.pv
+from components.pv import PV, modelchain_cache
+
+
+def create_pv(surface_azimuth: float):
+    """
+    Create PV system without database access
+    """
+    modules = pvlib.pvsystem.retrieve_sam('CECMod')
+    inverters = pvlib.pvsystem.retrieve_sam('cecinverter')
+    pv = PV.__new__(PV)
+    pv.env = type('Env', (), {'timezone': 'Etc/GMT-1'})()
+    pv.name = f'PV_{surface_azimuth}'
+    pv.temperature_model = 'open_rack_glass_glass'
+    pv.latitude, pv.longitude, pv.altitude = 48.0, 11.0, 500
+    pv.surface_tilt = 20
+    pv.surface_azimuth = surface_azimuth
+    pv.pv_module = modules.columns[100]
+    pv.pv_module_parameters = modules.iloc[:, 100]
+    inverter = inverters.loc[:, inverters.loc['Paco'] > 8000].columns[0]
+    pv.inverter = inverter
+    pv.inverter_parameters = inverters[inverter]
+    pv.modules_per_string = 10
+    pv.strings_per_inverter = 2
+    pv.location, pv.pv_system, pv.modelchain = pv.create_pvlib_parameters()
+
+    return pv
+
+
+def create_weather_data():
+    """
+    Clear sky day followed by a day with vanishing irradiance, the single diode model has no solution there
+    """
+    index = pd.date_range('2022-01-01', periods=48, freq='h', tz='Etc/GMT-1')
+    location = pvlib.location.Location(48.0, 11.0, tz='Etc/GMT-1', altitude=500)
+    clearsky = location.get_clearsky(index)
+    scale = np.where(np.arange(48) < 24, 1.0, 1e-22)
+    return pd.DataFrame({'ghi': clearsky['ghi'] * scale,
+                         'dni': clearsky['dni'] * scale,
+                         'dhi': clearsky['dhi'] * scale,
+                         'temp_air': 0.0,
+                         'wind_speed': 2.0,
+                         'pressure': 95000.0},
+                        index=index)
+
+
+def create_solar_data(weather_data: pd.DataFrame):
+    """
+    Solar data as created by env.Environment.create_solar_data
+    """
+    location = pvlib.location.Location(48.0, 11.0, tz='Etc/GMT-1', altitude=500)
+    solar_position = location.get_solarposition(times=weather_data.index,
+                                                pressure=weather_data['pressure'],
+                                                temperature=weather_data['temp_air'])
+    airmass = location.get_airmass(solar_position=solar_position,
+                                   model='kastenyoung1989')
+    solar_data = solar_position[['apparent_zenith', 'azimuth']].copy()
+    solar_data['airmass_relative'] = airmass['airmass_relative']
+    solar_data['dni_extra'] = pvlib.irradiance.get_extra_radiation(weather_data.index)
+
+    return solar_data
+
+
+@pytest.mark.parametrize('surface_azimuth', [90, 180, 270])
+def test_run_shared_matches_modelchain_at_low_irradiance(surface_azimuth):
+    modelchain_cache.clear()
+    weather_data = create_weather_data()
+    pv = create_pv(surface_azimuth=surface_azimuth)
+    pv.weather_data = weather_data
+    shared = pv.run_shared(solar_data=create_solar_data(weather_data))
+    pv.modelchain.run_model(weather_data)
+    reference = pv.modelchain.results.ac
+
+    assert not shared.isna().any()
+    np.testing.assert_allclose(shared.to_numpy(), reference.to_numpy(), atol=1e-6)
+
+
+def test_pv_profile_skips_weather_data_and_libraries():
+    class Env:
+        longitude, latitude = 11.0, 48.0
+        time = pd.Series(pd.date_range('2022-01-01', periods=96, freq='15min'))
+        dtype = np.float64
+        currency = 'US$'
+
+        @property
+        def altitude(self):
+            raise AssertionError('altitude looked up')
+
+        @property
+        def weather_data(self):
+            raise AssertionError('weather data loaded')
+
+        @property
+        def database(self):
+            raise AssertionError('database opened')
+
+    profile = np.linspace(0, 1000, 96)
+    pv = PV(env=Env(), name='PV_1', p_n=1000, pv_profile=profile)
+    np.testing.assert_allclose(pv.df['P [W]'].to_numpy(), profile)
+
+
+def test_identical_pv_systems_share_modelchain_run(create_environment, monkeypatch):
+    env = create_environment()
+    pv_data = {'surface_azimuth': 180, 'min_module_power': 200, 'max_module_power': 400,
+               'inverter_power_range': 2000}
+    env.add_pv(p_n=5000, pv_data=pv_data)
+    reference = env.pv[0]
+    runs = []
+    run_model = pvlib.modelchain.ModelChain.run_model
+    monkeypatch.setattr(pvlib.modelchain.ModelChain, 'run_model',
+                        lambda self, *args, **kwargs: runs.append(1) or run_model(self, *args, **kwargs))
+    env.add_pv(pv_data={'surface_azimuth': 180,
+                        'pv_module': reference.pv_module,
+                        'inverter': reference.inverter,
+                        'modules_per_string': reference.modules_per_string,
+                        'strings_per_inverter': reference.strings_per_inverter})
+
+    assert runs == []
+    assert len(components.pv.modelchain_cache) == 1
+    np.testing.assert_allclose(env.pv[1].df['P [W]'].to_numpy(), reference.df['P [W]'].to_numpy())
+
+
+def test_normalized_pv_scales_reference_of_same_selection(create_environment):
+    env = create_environment()
+    pv_data = {'surface_azimuth': 180, 'min_module_power': 200, 'max_module_power': 400,
+               'inverter_power_range': 2000}
+    env.add_pv(p_n=10000, pv_data=pv_data, normalized=True)
+    env.add_pv(p_n=5000, pv_data=pv_data, normalized=True)
+    reference, scaled = env.pv
+
+    np.testing.assert_allclose(scaled.df['P [W]'].to_numpy(), reference.df['P [W]'].to_numpy() / 2, atol=1e-6)
+    assert scaled.pv_module == reference.pv_module
+    assert scaled.inverter is None and scaled.modules_per_string is None and scaled.strings_per_inverter is None
+    assert scaled.pv_system is None and scaled.modelchain is None
+    assert set(scaled.config[scaled.name]) == {'module', 'surface_azimuth', 'surface_tilt'}
+
+    # Other selection parameters pick and simulate a new reference system
+    env.add_pv(p_n=5000, pv_data={**pv_data, 'inverter_power_range': 3000}, normalized=True)
+    assert env.pv[2].inverter is not None
+    assert env.pv[2].modelchain is not None
+
+
+def test_modelchain_steps_are_explicit():
+    pv = create_pv(surface_azimuth=180)
+
+    assert pv.modelchain.spectral_model.__name__ == 'no_spectral_loss'
+    assert pv.modelchain.aoi_model.__name__ == 'no_aoi_loss'
+    assert pv.modelchain.transposition_model == 'haydavies'
+
+
+def test_pv_batch_matches_single_pv_systems(create_environment):
+    picked = create_environment()
+    picked.add_pv(p_n=5000, pv_data={'surface_azimuth': 90, 'min_module_power': 200, 'max_module_power': 400,
+                                     'inverter_power_range': 2000})
+    pv_data = {'surface_azimuth': 90, 'pv_module': picked.pv[0].pv_module, 'inverter': picked.pv[0].inverter,
+               'modules_per_string': 10, 'strings_per_inverter': 2}
+    single = create_environment()
+    single.add_pv(pv_data=pv_data)
+    single.add_pv(pv_data={**pv_data, 'surface_azimuth': 270})
+    batch = create_environment()
+    components.pv.modelchain_cache.clear()
+    batch.add_pv_batch(specs=[{'pv_data': pv_data}, {'pv_data': {**pv_data, 'surface_azimuth': 270}}])
+
+    for pv_single, pv_batch in zip(single.pv, batch.pv):
+        np.testing.assert_allclose(pv_batch.df['P [W]'].to_numpy(), pv_single.df['P [W]'].to_numpy(),
+                                   rtol=1e-6, atol=1e-3)
+
+
+def test_seeded_environments_pick_the_same_pv_system(create_environment):
+    pv_data = {'surface_azimuth': 180, 'min_module_power': 200, 'max_module_power': 400,
+               'inverter_power_range': 2000}
+    systems = []
+    for _ in range(2):
+        env = create_environment(seed=3)
+        env.add_pv(p_n=5000, pv_data=pv_data)
+        systems.append((env.pv[0].pv_module, env.pv[0].inverter))
+
+    assert systems[0] == systems[1]
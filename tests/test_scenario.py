@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from operation import Operator
+from evaluation import Evaluation
+from scenario import ScenarioRunner
+
+
+def add_reference_pv(env):
+    """
+    Reference PV system with a daily production profile of 1 kWp
+    """
+    hours = np.arange(len(env.time_series)) * env.i_step / 60
+    profile = np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None) * 1000
+    env.add_pv(p_n=1000, pv_profile=profile)
+
+    return profile
+
+
+def test_designs_match_systems_built_one_by_one(create_environment, capsys):
+    env = create_environment(grid_connection=False)
+    profile = add_reference_pv(env)
+    designs = [{'pv': 5, 'storage': 10, 'dg': 4}, {'pv': 8, 'dg': 4}]
+    results = ScenarioRunner(env=env, processes=1).run(designs=designs)
+    assert list(results['pv']) == [5, 8]
+    assert results.loc[0, 'storage_power'] == 10 * 0.5
+    for i, design in enumerate(designs):
+        reference = env.copy_base()
+        reference.add_pv(p_n=design['pv'] * 1000, pv_profile=profile * design['pv'])
+        reference.add_diesel_generator(p_n=design['dg'] * 1000)
+        if 'storage' in design:
+            reference.add_storage(p_n=design['storage'] * 500, c=design['storage'] * 1000)
+        operator = Operator(env=reference, engine='array', export=False)
+        evaluation = Evaluation(env=reference, operator=operator, export=False)
+        system = evaluation.evaluation_df.loc['System']
+        for col in system.index:
+            assert results.loc[i, col] == pytest.approx(system[col], nan_ok=True), col
+        assert results.loc[i, 'Energy not supplied [kWh]'] == pytest.approx(
+            operator.unmet_load()['Energy not supplied [kWh]'])
+    # Base environment is not changed by the designs
+    assert len(env.pv) == 1 and len(env.storage) == 0 and len(env.diesel_generator) == 0
+
+
+def test_process_pool_matches_serial_run(create_environment, capsys):
+    env = create_environment()
+    add_reference_pv(env)
+    designs = [{'pv': pv, 'storage': storage} for pv in [2, 6] for storage in [0, 8]]
+    serial = ScenarioRunner(env=env, processes=1).run(designs=designs)
+    parallel = ScenarioRunner(env=env, processes=2).run(designs=designs)
+    pd.testing.assert_frame_equal(parallel, serial)
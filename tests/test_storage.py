@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from components.storage import soc_kernel
+
+# Pure Python kernel, soc_kernel is the numba dispatcher if numba is installed
+py_soc_kernel = getattr(soc_kernel, 'py_func', soc_kernel)
+parameters = {'p_n': 2000.0, 'c': 10000.0, 'soc_min': 0.05, 'soc_max': 0.95,
+              'n_charge': 0.9, 'n_discharge': 0.8, 't_step': 0.25}
+
+
+def reference(power, q_init, p_n, c, soc_min, soc_max, n_charge, n_discharge, t_step):
+    """
+    Step by step storage model of Storage.charge / Storage.discharge
+    """
+    p, q = [], []
+    q_prev = q_init
+    for i, request in enumerate(power):
+        p_i, q_i = 0.0, q_prev
+        if i > 0 and request > 0:
+            p_i = min(request, p_n)
+            if q_prev + p_i * n_charge * t_step < c * soc_max:
+                q_i = q_prev + p_i * n_charge * t_step
+            else:
+                p_i = (c * soc_max - q_prev) / (t_step * n_charge)
+                q_i = c * soc_max
+        elif i > 0 and request < 0:
+            p_i = max(request, -p_n)
+            if q_prev + p_i * n_discharge * t_step > c * soc_min:
+                q_i = q_prev + p_i * n_discharge * t_step
+            else:
+                p_i = -(q_prev - c * soc_min) / (t_step * n_charge)
+                q_i = c * soc_min
+        p.append(p_i)
+        q.append(q_i)
+        q_prev = q_i
+
+    return np.array(p), np.array(q)
+
+
+def power_requests():
+    rng = np.random.default_rng(0)
+    # Long charging and discharging periods reach soc_max and soc_min
+    return np.concatenate([rng.random(200) * 3000, -rng.random(300) * 3000, rng.normal(0, 1500, 500)])
+
+
+def test_py_kernel_matches_step_model():
+    power = power_requests()
+    p, q = py_soc_kernel(power, 2500.0, initial_step=True, **parameters)
+    p_ref, q_ref = reference(power, 2500.0, **parameters)
+    np.testing.assert_allclose(p, p_ref)
+    np.testing.assert_allclose(q, q_ref)
+    assert q.min() >= parameters['c'] * parameters['soc_min'] - 1e-9
+    assert q.max() <= parameters['c'] * parameters['soc_max'] + 1e-9
+
+
+def test_numba_kernel_matches_py_kernel():
+    pytest.importorskip('numba')
+    power = power_requests()
+    args = (power, 2500.0, *parameters.values(), True)
+    for result, expected in zip(soc_kernel(*args), py_soc_kernel(*args)):
+        np.testing.assert_allclose(result, expected)
+
+
+def test_kernel_continues_from_previous_chunk():
+    power = power_requests()
+    p, q = py_soc_kernel(power, 2500.0, initial_step=True, **parameters)
+    p_2, q_2 = py_soc_kernel(power[400:], q[399], initial_step=False, **parameters)
+    np.testing.assert_allclose(p_2, p[400:])
+    np.testing.assert_allclose(q_2, q[400:])
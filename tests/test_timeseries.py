@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+
+from timeseries import create_frame, write_column
+
+
+def test_create_frame_allocates_typed_columns():
+    index = pd.Series(pd.date_range('2023-01-01', periods=24, freq='h'))
+    df = create_frame(index=index, columns=['P [W]', 'Q [Wh]'])
+
+    assert list(df.columns) == ['P [W]', 'Q [Wh]']
+    assert (df.dtypes == np.float64).all()
+    assert df.isna().all().all()
+    pd.testing.assert_index_equal(df.index, pd.Index(index))
+
+
+def test_write_column_keeps_float_type():
+    df = create_frame(index=pd.date_range('2023-01-01', periods=4, freq='h'), columns=['P [W]'])
+    write_column(df=df, col='P [W]', values=[1, 2, 3, 4])
+    write_column(df=df, col='P [%]', values=np.arange(4))
+
+    assert df.dtypes.to_dict() == {'P [W]': np.float64, 'P [%]': np.float64}
+    np.testing.assert_array_equal(df['P [W]'], [1.0, 2.0, 3.0, 4.0])
+
+
+def test_component_frames_are_typed(create_environment):
+    env = create_environment()
+    hours = np.arange(len(env.time))
+    env.add_pv(p_n=1000, pv_profile=np.clip(np.sin((hours % 24 - 6) / 12 * np.pi), 0, None) * 1000)
+    env.add_storage(p_n=1000, c=2000)
+
+    for component in [env.load, env.pv[0], env.storage[0]]:
+        assert list(component.df.columns[:len(component.columns)]) == component.columns
+        assert (component.df.dtypes == np.float64).all()
+    assert env.load.df['P [W]'].notna().all()
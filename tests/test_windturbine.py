@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+windpowerlib = pytest.importorskip('windpowerlib')
+import components.windturbine
+
+
+def test_power_curve_lookup_at_hub_height(create_environment):
+    env = create_environment()
+    env.add_wind_turbine(selection_parameters=[1000000, 3000000])
+    wt = env.wind_turbine[0]
+    turbine = windpowerlib.WindTurbine(turbine_type=wt.turbine_data['turbine_type'],
+                                       hub_height=wt.hub_height)
+    # Hellman exponent of the terrain 'Agricultural terrain with some houses ...' (roughness length 0.055 m)
+    wind_speed_hub = env.wt_weather_data['wind_speed'] * (wt.hub_height / 10) ** (1 / np.log(wt.hub_height / 0.055))
+    expected = np.interp(wind_speed_hub.to_numpy(dtype=float), turbine.power_curve['wind_speed'],
+                         turbine.power_curve['value'], left=0, right=0)
+
+    assert 1000000 < wt.p_n < 3000000
+    assert wt.df['P [W]'].max() > 0
+    np.testing.assert_allclose(wt.df['P [W]'].to_numpy(), expected[:len(env.time)], rtol=1e-9)
+
+
+def test_identical_wind_turbines_share_simulation(create_environment):
+    env = create_environment()
+    env.add_wind_turbine(selection_parameters=[1000000, 3000000])
+    env.add_wind_turbine(turbine_data=dict(env.wind_turbine[0].turbine_data))
+
+    assert len(components.windturbine.power_output_cache) == 1
+    assert len(components.windturbine.hub_wind_speed_cache) == 1
+    assert len(components.windturbine.power_curve_cache) == 1
+    np.testing.assert_array_equal(env.wind_turbine[1].df['P [W]'], env.wind_turbine[0].df['P [W]'])
@@ -0,0 +1,58 @@
+import sys
+import numpy as np
+import pandas as pd
+
+# Float types of the precision modes {precision: dtype}
+precisions = {'double': np.float64, 'single': np.float32}
+
+
+def get_dtype(precision: str):
+    """
+    Get float type of precision mode
+    :param precision: str
+        'double' (float64) or 'single' (float32)
+    :return: np.dtype
+        float type
+    """
+    if precision not in precisions:
+        sys.exit(f'Precision {precision} not available. Choose from {list(precisions)}.')
+
+    return precisions[precision]
+
+
+def create_frame(index, columns: list, dtype=np.float64):
+    """
+    Create typed time series DataFrame of a component
+    All columns are allocated up front in one NaN filled float array
+    :param index: pd.Series or pd.DatetimeIndex
+        time index (env.time)
+    :param columns: list
+        column schema of the component class
+    :param dtype: np.dtype
+        float type of the series (np.float64 or np.float32)
+    :return: pd.DataFrame
+        time series
+    """
+    values = np.full((len(index), len(columns)), np.nan, dtype=dtype)
+
+    return pd.DataFrame(values,
+                        index=pd.Index(index),
+                        columns=columns,
+                        copy=False)
+
+
+def write_column(df: pd.DataFrame, col: str, values, dtype=np.float64):
+    """
+    Write values to a column of a typed time series, the column keeps the float type
+    :param df: pd.DataFrame
+        time series
+    :param col: str
+        column name
+    :param values: pd.Series, np.ndarray or list
+        values
+    :param dtype: np.dtype
+        float type of the series
+    :return: None
+    """
+    df[col] = values
+    df[col] = df[col].astype(dtype)